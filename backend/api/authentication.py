@@ -0,0 +1,35 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from foodgram.caches import is_shared_cache
+
+TOKEN_CACHE_TIMEOUT = getattr(settings, 'TOKEN_CACHE_TIMEOUT', 300)
+
+
+def get_token_cache_key(key):
+    return f'auth_token:{sha256(key.encode()).hexdigest()}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешированием пользователя.
+
+    Запись в кеше удаляется при удалении токена (выход из системы)
+    и при сохранении пользователя (смена пароля, деактивация).
+    Удаление видно всем воркерам только в общем кеше, поэтому
+    с локальным кешем процесса токен всегда проверяется по базе.
+    """
+
+    def authenticate_credentials(self, key):
+        if not TOKEN_CACHE_TIMEOUT or not is_shared_cache():
+            return super().authenticate_credentials(key)
+        cache_key = get_token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None and user.is_active:
+            return user, self.get_model()(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, user, TOKEN_CACHE_TIMEOUT)
+        return user, token
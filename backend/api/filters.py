@@ -1,7 +1,11 @@
 from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
 import django_filters
+from rest_framework.filters import SearchFilter
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+from recipes.tags import get_tag_map
 from users.models import User
 
 
@@ -19,9 +23,32 @@ class TagsMultipleChoiceField(
                     code='invalid_choice', params={'value': val},)
 
 
-class TagsFilter(django_filters.AllValuesMultipleFilter):
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
+
+
+class TagsFilter(django_filters.MultipleChoiceFilter):
+    """
+    Рецепты хотя бы с одним из тегов.
+
+    Слаги переводятся в id по закешированной карте тегов,
+    а фильтр через EXISTS не размножает строки рецептов.
+    """
+
     field_class = TagsMultipleChoiceField
 
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', get_tag_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_map = get_tag_map()
+        return qs.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('id'),
+            tag_id__in=[tag_map[slug] for slug in value if slug in tag_map])))
+
 
 class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='istartswith')
@@ -32,14 +59,34 @@ class IngredientFilter(django_filters.FilterSet):
 
 
 class RecipeFilter(django_filters.FilterSet):
-    author = django_filters.ModelChoiceFilter(queryset=User.objects.all())
+    author = django_filters.ModelChoiceFilter(
+        queryset=User.objects.only('id'))
     is_in_shopping_cart = django_filters.BooleanFilter(
         widget=django_filters.widgets.BooleanWidget(), label='В корзине.')
     is_favorited = django_filters.BooleanFilter(
         widget=django_filters.widgets.BooleanWidget(), label='В избранных.')
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name='tags__slug', label='Ссылка')
+    tags = TagsFilter(label='Ссылка')
+    ordering = django_filters.ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='filter_ordering', label='Сортировка')
 
     class Meta:
         model = Recipe
         fields = ['is_favorited', 'is_in_shopping_cart', 'author', 'tags']
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by('-popularity', '-pub_date')
+
+
+class RecipeSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск по названию, описанию и ингредиентам рецепта.
+
+    Найденные рецепты сортируются по релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query).order_by('-rank', '-pub_date')
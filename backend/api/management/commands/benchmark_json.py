@@ -0,0 +1,83 @@
+from timeit import Timer
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+
+def get_synthetic_recipes(limit):
+    tags = [
+        {'id': 1, 'name': 'Завтрак', 'color': '#ff8f1f', 'slug': 'breakfast'},
+        {'id': 2, 'name': 'Обед', 'color': '#6cc470', 'slug': 'lunch'}]
+    return [{
+        'id': index,
+        'tags': tags,
+        'author': {
+            'email': f'author{index}@example.com', 'id': index,
+            'username': f'author{index}', 'first_name': 'Иван',
+            'last_name': 'Иванов', 'is_subscribed': index % 2 == 0},
+        'ingredients': [{
+            'id': number, 'name': f'ингредиент номер {number}',
+            'measurement_unit': 'г', 'amount': number * 10.0}
+            for number in range(1, 11)],
+        'is_favorited': False,
+        'is_in_shopping_cart': index % 3 == 0,
+        'name': f'Рецепт номер {index}',
+        'image': f'http://localhost/media/static/recipes/{index}.png',
+        'text': 'Подробное описание приготовления блюда. ' * 20,
+        'cooking_time': 30,
+    } for index in range(1, limit + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Сравнение JSON-рендереров на странице списка рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help='Количество рецептов на странице')
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество повторов рендеринга')
+        parser.add_argument(
+            '--synthetic', action='store_true',
+            help='Не брать рецепты из базы')
+
+    def get_payload(self, limit, synthetic):
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'recipe__ingredient')[:limit]
+        if synthetic or len(recipes) < limit:
+            results = get_synthetic_recipes(limit)
+        else:
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = AnonymousUser()
+            for recipe in recipes:
+                recipe.is_favorited = recipe.is_in_shopping_cart = False
+            results = RecipeReadSerializer(
+                recipes, many=True, context={'request': request}).data
+        return {'count': limit, 'next': None, 'previous': None,
+                'results': results}
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен.')
+        payload = self.get_payload(options['limit'], options['synthetic'])
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        if standard.render(payload) != fast.render(payload):
+            raise CommandError('Результаты рендереров различаются.')
+        repeat = options['repeat']
+        timings = {}
+        for name, renderer in (('json', standard), ('orjson', fast)):
+            best = min(Timer(lambda: renderer.render(payload)).repeat(
+                repeat=5, number=repeat))
+            timings[name] = best / repeat * 1000
+            self.stdout.write(f'{name}: {timings[name]:.3f} мс на страницу')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {timings["json"] / timings["orjson"]:.1f}x '
+            f'({len(fast.render(payload))} байт)'))
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.recipe_list import get_recipe_rows, serialize_recipe_rows
+from api.serializers import RecipeReadSerializer
+from api.views import RecipesViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Проверка, что быстрый список рецептов побайтно совпадает '
+            'с RecipeReadSerializer')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', default=[],
+            help='id пользователя, от имени которого сравнивать')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Количество рецептов в одной пачке')
+
+    def compare(self, user, batch_size):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        view = RecipesViewSet(
+            request=request, format_kwarg=None, action='list', kwargs={})
+        queryset = view.get_queryset().order_by('id')
+        renderer = JSONRenderer()
+        mismatches = []
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return mismatches
+            last_id = batch[-1].id
+            expected = RecipeReadSerializer(
+                batch, many=True, context={'request': request}).data
+            actual = serialize_recipe_rows(get_recipe_rows(
+                queryset.filter(id__in=[recipe.id for recipe in batch])),
+                request)
+            for recipe, left, right in zip(batch, expected, actual):
+                if renderer.render(left) != renderer.render(right):
+                    mismatches.append(recipe.id)
+
+    def handle(self, *args, **options):
+        users = [AnonymousUser()] + list(
+            User.objects.filter(id__in=options['user']))
+        failed = False
+        for user in users:
+            mismatches = self.compare(user, options['batch_size'])
+            if mismatches:
+                failed = True
+                self.stderr.write(
+                    f'{user}: расхождения в рецептах {mismatches}')
+        if failed:
+            raise CommandError('Быстрый список рецептов отличается.')
+        self.stdout.write(self.style.SUCCESS(
+            'Быстрый список рецептов совпадает с сериализатором.'))
@@ -0,0 +1,97 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+# Библиотеки, которые нужны только отдельным эндпоинтам и командам
+# и не должны загружаться при старте воркера.
+LAZY_MODULES = ('reportlab', 'PIL', 'numpy', 'scipy', 'gunicorn')
+STARTUP_CODE = '''
+import time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print((time.perf_counter() - started) * 1000)
+'''
+
+
+def run_startup(importtime=False):
+    """
+    Запускает django.setup() и загрузку URL в отдельном процессе.
+    Возвращает время в мс и вывод -X importtime (если он включен).
+    """
+    command = [sys.executable, '-c', STARTUP_CODE]
+    if importtime:
+        command[1:1] = ['-X', 'importtime']
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    result = subprocess.run(
+        command, cwd=settings.BASE_DIR, env=env, capture_output=True,
+        text=True)
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(output):
+    """Строки importtime: (имя модуля, собственное и общее время в мс)."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        imports.append(
+            (name[1:].rstrip(), int(own) / 1000, int(cumulative) / 1000))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Время старта приложения: django.setup() и загрузка URL. '
+        'Завершается с ошибкой, если медиана превышает бюджет или '
+        'при старте загружаются тяжелые библиотеки, которые должны '
+        'импортироваться лениво.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget', type=float,
+            default=getattr(settings, 'STARTUP_BUDGET_MS', 1000),
+            help='Допустимое время старта, мс')
+        parser.add_argument(
+            '--runs', type=int, default=5,
+            help='Количество запусков для медианы')
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько самых долгих импортов верхнего уровня показать')
+
+    def handle(self, *args, **options):
+        timings = [run_startup()[0] for _ in range(options['runs'])]
+        median = statistics.median(timings)
+        imports = parse_importtime(run_startup(importtime=True)[1])
+        top_level = sorted(
+            ((name, cumulative) for name, _, cumulative in imports
+             if not name.startswith(' ')),
+            key=lambda item: item[1], reverse=True)
+        self.stdout.write(
+            f'Импортов: {len(imports)}, самые долгие (с -X importtime):')
+        for name, cumulative in top_level[:options['top']]:
+            self.stdout.write(f'  {cumulative:>8.1f} мс  {name}')
+        eager = sorted({
+            name.strip().split('.')[0] for name, _, _ in imports} & set(
+            LAZY_MODULES))
+        if eager:
+            raise CommandError(
+                'При старте загружаются модули, которые должны '
+                f'импортироваться лениво: {", ".join(eager)}')
+        if median > options['budget']:
+            raise CommandError(
+                f'Старт занимает {median:.0f} мс при бюджете '
+                f'{options["budget"]:.0f} мс.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Старт: медиана {median:.0f} мс, минимум {min(timings):.0f} мс '
+            f'из {len(timings)} запусков, бюджет {options["budget"]:.0f} мс.'))
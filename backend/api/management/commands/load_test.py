@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+LOAD_USER_EMAIL = 'loadtest{}@example.com'
+SCENARIOS = {
+    'browse': 5,
+    'tags': 3,
+    'cart': 2,
+    'pdf': 1,
+    'subscriptions': 1,
+}
+UNLIMITED_RATE = '1000000/s'
+
+
+def get_fixtures(users):
+    """Пользователи с токенами и данные, по которым ходят сценарии."""
+    recipe_ids = list(Recipe.objects.order_by('-id').values_list(
+        'id', flat=True)[:200])
+    if not recipe_ids:
+        raise CommandError(
+            'В базе нет рецептов: загрузите их командой import_recipes.')
+    tokens = []
+    for index in range(users):
+        user, created = User.objects.get_or_create(
+            email=LOAD_USER_EMAIL.format(index),
+            defaults={'username': f'loadtest{index}',
+                      'first_name': 'Нагрузка', 'last_name': str(index)})
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=('password',))
+        tokens.append(Token.objects.get_or_create(user=user)[0].key)
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    return {
+        'recipes': recipe_ids,
+        'pages': max(1, min(5, len(recipe_ids) // page_size)),
+        'tags': list(Tag.objects.values_list('slug', flat=True)),
+        'tokens': tokens,
+    }
+
+
+def get_steps(scenario, fixtures, rng):
+    """Запросы сценария: (имя, метод, путь, нужен ли токен)."""
+    recipe_id = rng.choice(fixtures['recipes'])
+    if scenario == 'browse':
+        page = rng.randint(1, fixtures['pages'])
+        return [
+            ('recipes', 'GET', f'/api/recipes/?page={page}', False),
+            ('recipe', 'GET', f'/api/recipes/{recipe_id}/', False),
+            ('tags', 'GET', '/api/tags/', False),
+        ]
+    if scenario == 'tags':
+        slugs = rng.sample(fixtures['tags'], min(2, len(fixtures['tags'])))
+        query = '&'.join(f'tags={slug}' for slug in slugs)
+        return [('recipes_by_tags', 'GET', f'/api/recipes/?{query}', False)]
+    if scenario == 'cart':
+        return [
+            ('favorite', 'POST', f'/api/recipes/{recipe_id}/favorite/', True),
+            ('cart_add', 'POST',
+             f'/api/recipes/{recipe_id}/shopping_cart/', True),
+            ('favorites', 'GET', '/api/recipes/?is_favorited=1', True),
+            ('unfavorite', 'DELETE',
+             f'/api/recipes/{recipe_id}/favorite/', True),
+        ]
+    if scenario == 'pdf':
+        return [('pdf', 'GET', '/api/recipes/download_shopping_cart/', True)]
+    return [
+        ('subscriptions', 'GET',
+         '/api/users/subscriptions/?recipes_limit=3', True),
+        ('feed', 'GET', '/api/recipes/feed/', True),
+    ]
+
+
+def send(base_url, method, path, token):
+    request = Request(base_url + path, method=method)
+    if token:
+        request.add_header('Authorization', f'Token {token}')
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=30) as response:
+            response.read()
+            code = response.status
+    except HTTPError as error:
+        code = error.code
+    except (URLError, OSError):
+        code = 0
+    return code, time.perf_counter() - started
+
+
+def run_user(base_url, fixtures, scenarios, deadline, seed):
+    """Виртуальный пользователь: выполняет сценарии до deadline."""
+    rng = random.Random(seed)
+    token = fixtures['tokens'][seed % len(fixtures['tokens'])]
+    names, weights = zip(*scenarios.items())
+    results = []
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        for name, method, path, auth in get_steps(scenario, fixtures, rng):
+            code, latency = send(base_url, method, path, auth and token)
+            results.append((name, code, latency))
+    return results
+
+
+def run_load(base_url, fixtures, scenarios, concurrency, duration):
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [
+            executor.submit(
+                run_user, base_url, fixtures, scenarios, deadline, seed)
+            for seed in range(concurrency)]
+        results = [result for future in futures
+                   for result in future.result()]
+    return results, time.monotonic() - started
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(results):
+    latencies = sorted(latency for _, _, latency in results)
+    errors = sum(1 for _, code, _ in results if not 200 <= code < 400)
+    return {
+        'requests': len(results),
+        'errors': errors / len(results) if results else 0,
+        'p50': percentile(latencies, 0.5) * 1000 if results else 0,
+        'p90': percentile(latencies, 0.9) * 1000 if results else 0,
+        'p99': percentile(latencies, 0.99) * 1000 if results else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочное тестирование: запускает gunicorn с разным числом '
+        'и типом воркеров и гоняет по нему сценарии пользователей. '
+        'Работает с той базой, что указана в настройках (SQLite или '
+        'PostgreSQL); SQLite выполняет записи по одной.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[2],
+            help='Количество воркеров gunicorn, можно несколько')
+        parser.add_argument(
+            '--worker-class', nargs='+', default=['sync'],
+            help='Типы воркеров gunicorn (sync, gthread, gevent)')
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Потоков на воркер; передается gunicorn только для gthread, '
+                 'иначе sync с несколькими потоками становится gthread')
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Количество одновременных виртуальных пользователей')
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность каждого прогона, секунды')
+        parser.add_argument(
+            '--scenario', choices=SCENARIOS, nargs='+',
+            default=list(SCENARIOS),
+            help='Сценарии, которые выполняют пользователи')
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Количество пользователей с токенами')
+        parser.add_argument(
+            '--port', type=int, default=8765,
+            help='Порт, на котором запускается gunicorn')
+        parser.add_argument(
+            '--url',
+            help='Нагружать уже запущенный сервер вместо своего gunicorn')
+        parser.add_argument(
+            '--keep-throttling', action='store_true',
+            help='Не отключать ограничение частоты запросов')
+
+    def start_server(self, worker_class, workers, options):
+        env = dict(os.environ)
+        if not options['keep_throttling']:
+            env['THROTTLE_USER_RATE'] = env['THROTTLE_IP_RATE'] = (
+                UNLIMITED_RATE)
+        command = [
+            sys.executable, '-m', 'gunicorn', 'foodgram.wsgi:application',
+            '--bind', f'127.0.0.1:{options["port"]}',
+            '--workers', str(workers), '--worker-class', worker_class,
+            '--log-level', 'warning']
+        if worker_class == 'gthread':
+            command += ['--threads', str(options['threads'])]
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        for _ in range(100):
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn завершился: {command}')
+            if send(base_url, 'GET', '/api/tags/', None)[0] == 200:
+                return server, base_url
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError('gunicorn не ответил за 20 секунд.')
+
+    def report(self, title, results, elapsed):
+        total = summarize(results)
+        self.stdout.write(self.style.SUCCESS(
+            f'{title}: {total["requests"] / elapsed:.1f} запр/с, '
+            f'ошибок {total["errors"]:.1%}, p50 {total["p50"]:.0f} мс, '
+            f'p90 {total["p90"]:.0f} мс, p99 {total["p99"]:.0f} мс'))
+        for name in sorted({name for name, _, _ in results}):
+            stats = summarize([result for result in results
+                               if result[0] == name])
+            self.stdout.write(
+                f'  {name:<16} {stats["requests"]:>7} '
+                f'ошибок {stats["errors"]:>6.1%} '
+                f'p50 {stats["p50"]:>6.0f} p90 {stats["p90"]:>6.0f} '
+                f'p99 {stats["p99"]:>6.0f} мс')
+        return total
+
+    def handle(self, *args, **options):
+        fixtures = get_fixtures(options['users'])
+        scenarios = {name: SCENARIOS[name] for name in options['scenario']}
+        if options['url']:
+            results, elapsed = run_load(
+                options['url'].rstrip('/'), fixtures, scenarios,
+                options['concurrency'], options['duration'])
+            self.report(options['url'], results, elapsed)
+            return
+        for worker_class in options['worker_class']:
+            for workers in options['workers']:
+                server, base_url = self.start_server(
+                    worker_class, workers, options)
+                try:
+                    results, elapsed = run_load(
+                        base_url, fixtures, scenarios,
+                        options['concurrency'], options['duration'])
+                finally:
+                    server.terminate()
+                    server.wait()
+                self.report(
+                    f'{worker_class} x{workers}', results, elapsed)
@@ -1,3 +1,14 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from api.recipe_list import get_recipe_rows, serialize_recipe_rows
+
+
 class GetIsSubscribedMixin:
 
     def get_is_subscribed(self, obj):
@@ -5,3 +16,70 @@ class GetIsSubscribedMixin:
         if not user.is_authenticated:
             return False
         return user.follower.filter(author=obj).exists()
+
+
+class ConditionalGetMixin:
+    """
+    Поддержка ETag и Last-Modified для list и retrieve.
+
+    Вьюсет возвращает версию данных из get_list_version(queryset)
+    и get_object_version() в виде пары (дата изменения или None,
+    состояние).
+    Если версия совпадает с присланной клиентом, ответ 304 отдается
+    без сериализации.
+    """
+
+    def get_list_version(self, queryset):
+        raise NotImplementedError
+
+    def get_object_version(self):
+        raise NotImplementedError
+
+    def conditional_response(self, version, render):
+        if version is None:
+            return render()
+        last_modified, state = version
+        etag = quote_etag(md5(repr((
+            self.request.get_full_path(), self.request.user.pk, state
+        )).encode()).hexdigest())
+        timestamp = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_version(self.filter_queryset(self.get_queryset())),
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_object_version(),
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs))
+
+
+class RecipeRowsListMixin:
+    """
+    list() через values()-запросы вместо RecipeReadSerializer.
+
+    Отключается настройкой RECIPE_LIST_FAST_PATH.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_LIST_FAST_PATH:
+            return super().list(request, *args, **kwargs)
+        rows = get_recipe_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serialize_recipe_rows(page, request))
+        return Response(serialize_recipe_rows(rows, request))
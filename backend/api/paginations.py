@@ -1,6 +1,187 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+import binascii
+from datetime import datetime
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.versions import (FAVORITES, RECIPES, SHOPPING_CART, TAGS,
+                              get_versions)
+
+PAGE_COUNT_TIMEOUT = getattr(settings, 'PAGE_COUNT_TIMEOUT', 60)
+PAGE_COUNT_ESTIMATE_THRESHOLD = getattr(
+    settings, 'PAGE_COUNT_ESTIMATE_THRESHOLD', 10000)
+
+
+def get_estimated_count(queryset):
+    """
+    Оценка количества строк таблицы queryset по статистике
+    планировщика PostgreSQL той базы, из которой он читается. None,
+    если база другая или таблица маленькая и точный подсчет дешев.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < PAGE_COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return row[0]
+
+
+class CountPaginator(Paginator):
+    """Paginator, который получает количество объектов от get_count."""
+
+    def __init__(self, object_list, per_page, get_count):
+        super().__init__(object_list, per_page)
+        self.get_count = get_count
+
+    @cached_property
+    def count(self):
+        return self.get_count()
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class CachedCountPagination(LimitPageNumberPagination):
+    """
+    Пагинация с кешированным количеством рецептов.
+
+    Количество кешируется на PAGE_COUNT_TIMEOUT секунд по базе,
+    набору фильтров запроса и версиям рецептов и тегов, а для фильтров
+    по избранному и корзине — еще и по версиям данных пользователя,
+    так что любое изменение сразу дает новый ключ. Для анонимного
+    списка без фильтров в PostgreSQL берется оценка планировщика.
+    """
+
+    ignored_params = ('page', 'limit', 'ordering', 'profile')
+    user_params = {
+        'is_favorited': FAVORITES,
+        'is_in_shopping_cart': SHOPPING_CART,
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountPaginator(
+            object_list, per_page, lambda: self.get_count(object_list))
+
+    def get_filter_params(self):
+        params = self.request.query_params
+        return tuple(sorted(
+            (name, tuple(sorted(params.getlist(name))))
+            for name in params if name not in self.ignored_params))
+
+    def get_count(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        params = self.get_filter_params()
+        user = self.request.user
+        if not params and not user.is_authenticated:
+            estimate = get_estimated_count(queryset)
+            if estimate is not None:
+                return estimate
+        filters = dict(params)
+        version_keys = [(RECIPES, None), (TAGS, None)] + [
+            (namespace, user.id)
+            for name, namespace in self.user_params.items()
+            if name in filters]
+        versions = get_versions(*version_keys)
+        # База входит в ключ: количество с отстающей реплики
+        # не должно попадать в ответы, читающие из основной базы.
+        key = 'page_count:' + sha256(repr((
+            queryset.db, getattr(self.view, 'basename', None),
+            getattr(self.view, 'action', None),
+            params, sorted(versions.items()),
+        )).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, PAGE_COUNT_TIMEOUT)
+        return count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (pub_date, id) для лент.
+
+    Вместо OFFSET следующая страница запрашивается курсором
+    с ключом последней записи, поэтому стоимость не растет с глубиной.
+    """
+
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            pub_date, key = b64decode(
+                encoded.encode('ascii'), altchars=b'-_',
+                validate=True).decode('ascii').split('|')
+            return datetime.fromisoformat(pub_date), int(key)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        pub_date, key = position
+        encoded = b64encode(
+            f'{pub_date.isoformat()}|{key}'.encode('ascii'), altchars=b'-_')
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, encoded.decode('ascii'))
+
+    def paginate_positions(self, fetch, request):
+        """
+        Вызывает fetch(cursor, limit) и запоминает ключ последней
+        записи страницы для ссылки на следующую.
+        """
+        self.request = request
+        limit = self.get_page_size(request)
+        positions = fetch(self.decode_cursor(request), limit)
+        self.next_position = (
+            positions[-1] if len(positions) == limit else None)
+        return positions
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -7,7 +7,8 @@ from rest_framework import serializers
 
 from api.mixins import GetIsSubscribedMixin
 from recipes.models import (Ingredient, Recipe, RecipeIngredient,
-                            Subscription, Tag)
+                            ShoppingCartJob, Subscription, Tag)
+from recipes.signals import recipe_ingredients_changed
 
 User = get_user_model()
 auth_error = 'Не удается войти в систему с предоставленными учетными данными.'
@@ -77,7 +78,7 @@ class SetPasswordSerializer(serializers.Serializer):
         user = self.context['request'].user
         password = make_password(validated_data.get('new_password'))
         user.password = password
-        user.save()
+        user.save(update_fields=('password',))
         return validated_data
 
 
@@ -141,6 +142,20 @@ class RecipeReadSerializer(serializers.ModelSerializer):
                   'name', 'image', 'text', 'cooking_time')
 
 
+class RecipeCoverageSerializer(RecipeReadSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ('coverage', 'missing',)
+
+
+class CookQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False)
+    missing = serializers.IntegerField(min_value=0, default=0)
+
+
 class RecipeWhriteSerilaizer(serializers.ModelSerializer):
     image = Base64ImageField(use_url=True)
     tags = serializers.PrimaryKeyRelatedField(
@@ -196,6 +211,7 @@ class RecipeWhriteSerilaizer(serializers.ModelSerializer):
                 amount=ingredient.get('amount'),
             ) for ingredient in ingredients]
         )
+        recipe_ingredients_changed.send(sender=Recipe, instance=recipe)
 
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
@@ -250,3 +266,10 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         else:
             recipes = obj.author.recipe.all()
         return SubscriptionRecipeSerializer(recipes, many=True).data
+
+
+class ShoppingCartJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ShoppingCartJob
+        fields = ('id', 'status', 'file', 'created', 'finished',)
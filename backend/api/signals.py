@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import get_token_cache_key
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    cache.delete(get_token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        cache.delete_many([
+            get_token_cache_key(key) for key in Token.objects.filter(
+                user=instance).values_list('key', flat=True)])
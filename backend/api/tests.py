@@ -0,0 +1,204 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.throttling import CostThrottle
+
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Subscription,
+                            Tag)
+
+User = get_user_model()
+
+
+class RecipeListFastPathTest(TestCase):
+    """Быстрый список рецептов совпадает с RecipeReadSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='pass')
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='pass')
+        breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        dinner = Tag.objects.create(
+            name='Ужин', color='#49B64E', slug='dinner')
+        potato = Ingredient.objects.create(
+            name='картофель', measurement_unit='г')
+        milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл')
+        cls.recipes = []
+        for index, tags in enumerate(
+                ((breakfast,), (dinner,), (breakfast, dinner), ())):
+            recipe = Recipe.objects.create(
+                author=cls.author if index % 2 else cls.reader,
+                name=f'Рецепт {index}', text=f'Описание {index}',
+                cooking_time=10 + index,
+                image=f'recipes/images/{index}.png' if index else '')
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=potato,
+                                 amount=100 + index),
+                RecipeIngredient(recipe=recipe, ingredient=milk,
+                                 amount=200)][:index % 2 + 1])
+            cls.recipes.append(recipe)
+        FavoriteRecipe.objects.create(
+            user=cls.reader, recipe=cls.recipes[1])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[2])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, client, fast_path, query=''):
+        with override_settings(RECIPE_LIST_FAST_PATH=fast_path):
+            response = client.get(f'/api/recipes/?limit=10{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assert_same_output(self, client, query=''):
+        expected = self.get_list(client, False, query)
+        # Первый запрос заполняет кеш рецептов, второй читает из него.
+        self.assertEqual(self.get_list(client, True, query), expected)
+        self.assertEqual(self.get_list(client, True, query), expected)
+
+    def test_anonymous(self):
+        self.assert_same_output(APIClient())
+        self.assertEqual(
+            json.loads(self.get_list(APIClient(), True))['count'],
+            len(self.recipes))
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        self.assert_same_output(client)
+        self.assert_same_output(client, '&is_favorited=1')
+        self.assert_same_output(client, '&is_in_shopping_cart=1')
+        self.assert_same_output(client, '&tags=breakfast')
+
+    def test_flags_are_per_user(self):
+        reader, author = APIClient(), APIClient()
+        reader.force_authenticate(self.reader)
+        author.force_authenticate(self.author)
+        self.assert_same_output(reader)
+        self.assert_same_output(author)
+
+
+class RecipeConditionalGetTest(TestCase):
+    """ETag списка и рецепта меняется вместе с содержимым ответа."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Рецептов', password='pass')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=10)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assert_changed(self, url, change):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def rename_author(self):
+        self.author.first_name = 'Новое имя'
+        self.author.save()
+
+    def test_author_rename(self):
+        self.assert_changed('/api/recipes/', self.rename_author)
+        self.assert_changed(
+            f'/api/recipes/{self.recipe.id}/', self.rename_author)
+
+    def test_login_keeps_etag(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/auth/token/login/', {
+                'email': 'author@example.com', 'password': 'pass'})
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_follows_user_flags(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.client.force_authenticate(self.author)
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        self.assert_changed(url, lambda: FavoriteRecipe.objects.create(
+            user=self.author, recipe=self.recipe))
+
+
+def throttle_rates(user, ip):
+    return override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK,
+        DEFAULT_THROTTLE_RATES={'user': user, 'ip': ip}))
+
+
+class CostThrottleTest(TestCase):
+    """Ограничение запросов по стоимости."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Поваров', password='pass')
+
+    def setUp(self):
+        cache.clear()
+        self.timer = mock.patch.object(CostThrottle, 'timer')
+        self.timer.start().return_value = 600.0
+        self.addCleanup(self.timer.stop)
+
+    def set_time(self, seconds):
+        CostThrottle.timer.return_value = 600.0 + seconds
+
+    def get_status(self, client, url):
+        return client.get(url).status_code
+
+    @throttle_rates('30/min', '1000/min')
+    def test_view_costs(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(self.get_status(
+            client, '/api/recipes/download_shopping_cart/'), 200)
+        for _ in range(10):
+            self.assertEqual(self.get_status(client, '/api/tags/'), 200)
+        self.set_time(15)
+        response = client.get('/api/tags/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '45')
+
+    @throttle_rates('1000/min', '10/min')
+    def test_list_cost_grows_with_limit(self):
+        client = APIClient()
+        # Стоимость 1 + page * limit // 100: 6, 5 и 4.
+        self.assertNotEqual(
+            self.get_status(client, '/api/recipes/?page=5&limit=100'), 429)
+        self.assertEqual(
+            self.get_status(client, '/api/recipes/?page=4&limit=100'), 429)
+        self.assertNotEqual(
+            self.get_status(client, '/api/recipes/?page=3&limit=100'), 429)
+        # Через полминуты следующего окна из предыдущего учитывается
+        # половина: 10 / 2 + 6 > 10, а 10 / 2 + 5 укладывается.
+        self.set_time(90)
+        response = client.get('/api/recipes/?page=5&limit=100')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertNotEqual(
+            self.get_status(client, '/api/recipes/?page=4&limit=100'), 429)
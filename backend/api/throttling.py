@@ -0,0 +1,96 @@
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'240/min' -> (240, 60); None означает отсутствие ограничения."""
+    if rate is None:
+        return None, None
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Ограничение суммарной стоимости запросов за скользящее окно
+    на пользователя и на IP.
+
+    Лимиты задаются в DEFAULT_THROTTLE_RATES ключами 'user' и 'ip'
+    (например, '240/min': запросы общей стоимостью до 240 за минуту).
+    Представление указывает стоимость запроса атрибутами throttle_cost
+    и throttle_costs (по action) или методом get_throttle_cost(request).
+
+    Расход за окно — счетчик текущего окна плюс доля счетчика
+    предыдущего, пропорциональная еще не прошедшей части окна.
+    Retry-After — время до конца текущего окна. Счетчики увеличиваются
+    атомарным cache.incr, поэтому одновременные запросы не проходят
+    все сразу; отклоненный запрос возвращает списанную стоимость. Кеш
+    должен быть общим для воркеров, иначе лимит считается в каждом
+    отдельно.
+    """
+
+    cache = cache
+    timer = time.time
+    scopes = ('user', 'ip')
+
+    def get_rate(self, scope):
+        return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+
+    def get_cost(self, request, view):
+        if hasattr(view, 'get_throttle_cost'):
+            return view.get_throttle_cost(request)
+        return getattr(view, 'throttle_costs', {}).get(
+            getattr(view, 'action', None), getattr(view, 'throttle_cost', 1))
+
+    def get_buckets(self, request):
+        if request.user and request.user.is_authenticated:
+            yield 'user', f'throttle:user:{request.user.pk}'
+        yield 'ip', f'throttle:ip:{self.get_ident(request)}'
+
+    def charge(self, key, cost, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key, cost)
+        except ValueError:
+            # Счетчик вытеснили между add и incr.
+            self.cache.set(key, cost, timeout)
+            return cost
+
+    def refund(self, key, cost):
+        try:
+            self.cache.decr(key, cost)
+        except ValueError:
+            pass
+
+    def allow_request(self, request, view):
+        cost = self.get_cost(request, view)
+        if not cost:
+            return True
+        now = self.timer()
+        charged = []
+        self.wait_seconds = 0
+        for scope, key in self.get_buckets(request):
+            capacity, duration = self.get_rate(scope)
+            if capacity is None:
+                continue
+            window, elapsed = divmod(now, duration)
+            current_key = f'{key}:{int(window)}'
+            previous = self.cache.get(f'{key}:{int(window) - 1}', 0)
+            used = self.charge(current_key, cost, duration * 2)
+            charged.append(current_key)
+            if previous * (1 - elapsed / duration) + used > capacity:
+                self.wait_seconds = max(
+                    self.wait_seconds, duration - elapsed)
+        if self.wait_seconds:
+            for key in charged:
+                self.refund(key, cost)
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
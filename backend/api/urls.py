@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (AuthToken, ControlFavoriteRecipe, ControlShoppingCart,
                        ControlSubscription, IngredientViewSet, RecipesViewSet,
-                       set_password, TagViewSet, UsersViewSet)
+                       set_password, ShoppingCartJobView, TagViewSet,
+                       UsersViewSet)
 
 app_name = 'api'
 
@@ -22,6 +23,8 @@ urlpatterns = [
          ControlFavoriteRecipe.as_view(), name='favorite'),
     path('recipes/<int:recipe_id>/shopping_cart/',
          ControlShoppingCart.as_view(), name='shopping_cart'),
+    path('recipes/download_shopping_cart/<int:job_id>/',
+         ShoppingCartJobView.as_view(), name='shopping_cart_job'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -1,15 +1,13 @@
-import io
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from django.db.models.aggregates import Count, Sum
+from django.db.models.aggregates import Count
 from django.db.models.expressions import Exists, OuterRef, Value
+from django.db.models.query import Prefetch
 from django.http import FileResponse
 from django.shortcuts import get_object_or_404
+from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import generics, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
@@ -19,16 +17,29 @@ from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         SAFE_METHODS)
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter
+from api.filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
+from api.mixins import ConditionalGetMixin, RecipeRowsListMixin
+from api.paginations import CachedCountPagination, KeysetPagination
 from api.permissions import IsAdminOrReadOnly
-from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+from api.serializers import (CookQuerySerializer, IngredientSerializer,
+                             RecipeCoverageSerializer, RecipeReadSerializer,
                              RecipeWhriteSerilaizer, SetPasswordSerializer,
+                             ShoppingCartJobSerializer,
                              SubscriptionRecipeSerializer,
                              SubscriptionSerializer, TagSerializer,
                              TokenSerializer, UserGetSerializer,
                              UserPostSerializer)
+from recipes.catalog import get_catalog_manifest
+from recipes.feed import backfill, get_feed, prune
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            ShoppingCart, Subscription, Tag)
+                            RecipeIngredient, ShoppingCart, Subscription,
+                            Tag)
+from recipes.shopping_cart import (enqueue_job, get_shopping_cart,
+                                   render_shopping_cart)
+from recipes.versions import (AUTHORS, FAVORITES, POPULARITY, RECIPES,
+                              SHOPPING_CART, SUBSCRIPTIONS, TAGS,
+                              get_versions)
 
 User = get_user_model()
 
@@ -68,13 +79,13 @@ class UsersViewSet(UserViewSet):
 
     serializer_class = (UserGetSerializer,)
     permission_classes = (IsAuthenticated,)
+    search_fields = ('^username', '^first_name', '^last_name')
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
             return User.objects.annotate(
                 is_subscribed=Exists(self.request.user.follower.filter(
-                    author=OuterRef('id')))
-            ).prefetch_related('follower', 'following')
+                    author=OuterRef('id'))))
         else:
             return User.objects.annotate(is_subscribed=Value(False))
 
@@ -127,14 +138,48 @@ class IngredientViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     filterset_class = IngredientFilter
     pagination_class = None
+    throttle_costs = {'list': 2}
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        Ссылка на текущий снимок всего справочника.
+
+        Файл раздается nginx со сжатием и долгим кешированием,
+        клиент может фильтровать его локально.
+        """
+
+        manifest = get_catalog_manifest()
+        return Response({
+            'version': manifest['version'],
+            'url': request.build_absolute_uri(
+                settings.MEDIA_URL + manifest['path']),
+            'size': manifest['size'],
+        })
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ConditionalGetMixin, RecipeRowsListMixin,
+                     viewsets.ModelViewSet):
     """Рецепты."""
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
+    pagination_class = CachedCountPagination
+    throttle_costs = {'download_shopping_cart': 20, 'cook': 5, 'feed': 2}
+
+    def get_throttle_cost(self, request):
+        """Глубокие и длинные страницы списка стоят дороже."""
+        if self.action != 'list':
+            return self.throttle_costs.get(self.action, 1)
+        try:
+            page = int(request.query_params.get('page', 1))
+            limit = int(request.query_params.get(
+                'limit', self.pagination_class.page_size))
+        except ValueError:
+            return 1
+        return min(1 + max(page, 1) * max(limit, 1) // 100, 100)
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -143,65 +188,158 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Recipe.objects.annotate(
+            recipes = Recipe.objects.annotate(
                 is_favorited=Exists(
                     FavoriteRecipe.objects.filter(
                         user=self.request.user, recipe=OuterRef('id'))),
                 is_in_shopping_cart=Exists(
                     ShoppingCart.objects.filter(
-                        user=self.request.user, recipe=OuterRef('id')))
-            ).select_related('author').prefetch_related(
-                'tags', 'ingredients', 'recipe',
-                'shopping_cart', 'favorite_recipe')
+                        user=self.request.user, recipe=OuterRef('id'))))
         else:
-            return Recipe.objects.annotate(
+            recipes = Recipe.objects.annotate(
                 is_favorited=Value(False),
-                is_in_shopping_cart=Value(False)
-            ).select_related('author').prefetch_related(
-                'tags', 'ingredients', 'recipe',
-                'shopping_cart', 'favorite_recipe')
+                is_in_shopping_cart=Value(False))
+        return recipes.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only(
+                'id', 'name', 'color', 'slug')),
+            Prefetch('recipe', queryset=RecipeIngredient.objects.only(
+                'recipe', 'amount', 'ingredient__name',
+                'ingredient__measurement_unit').select_related('ingredient'))
+        ).defer('search_vector', 'search_document')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_version_keys(self, *namespaces):
+        """
+        Ключи версий пространств namespaces, профилей авторов
+        и данных пользователя, от которых зависят флаги is_favorited,
+        is_in_shopping_cart и is_subscribed в ответе.
+        """
+        keys = [(namespace, None) for namespace in (AUTHORS, *namespaces)]
+        user = self.request.user
+        if user.is_authenticated:
+            keys += [(namespace, user.id) for namespace in (
+                FAVORITES, SHOPPING_CART, SUBSCRIPTIONS)]
+        return keys
+
+    def get_list_version(self, queryset):
+        """
+        Версия списка по счетчикам recipes.versions и кешированному
+        количеству рецептов, без запросов к таблице рецептов.
+        Порядок по популярности меняют и чужие пользователи,
+        поэтому для него учитывается версия популярности.
+        """
+        namespaces = [RECIPES, TAGS]
+        if 'ordering' in self.request.query_params:
+            namespaces.append(POPULARITY)
+        versions = get_versions(*self.get_version_keys(*namespaces))
+        count = None
+        if self.paginator is not None:
+            self.paginator.request, self.paginator.view = self.request, self
+            count = self.paginator.get_count(queryset)
+        return None, (tuple(sorted(versions.items())), count)
+
+    def get_object_version(self):
+        """
+        Версия рецепта по дате изменения и версиям recipes.versions.
+        Last-Modified не отдается: флаги пользователя меняются
+        без изменения рецепта, и If-Modified-Since дал бы старый ответ.
+        """
+        try:
+            recipe_changed = Recipe.objects.filter(
+                id=self.kwargs['pk']).values_list(
+                'updated_at', flat=True).first()
+        except ValueError:
+            return None
+        if recipe_changed is None:
+            return None
+        versions = get_versions(*self.get_version_keys())
+        return None, (recipe_changed, tuple(sorted(versions.items())))
+
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        """
+        Рецепты, которые можно приготовить из переданных ингредиентов,
+        докупив не больше missing продуктов.
+        """
+
+        query = CookQuerySerializer(data={
+            'ingredients': request.query_params.getlist('ingredients'),
+            'missing': request.query_params.get('missing', 0)})
+        query.is_valid(raise_exception=True)
+        ranked = ingredient_index.cover(
+            query.validated_data['ingredients'],
+            query.validated_data['missing'])
+        page = self.paginate_queryset(ranked)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page])
+        results = []
+        for recipe_id, coverage, missing in page:
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.coverage, recipe.missing = coverage, missing
+                results.append(recipe)
+        serializer = RecipeCoverageSerializer(
+            results, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+
+        paginator = KeysetPagination()
+        positions = paginator.paginate_positions(
+            lambda cursor, limit: get_feed(request.user, cursor, limit),
+            request)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in positions])
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for _, recipe_id in positions
+             if recipe_id in recipes], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Рецепты с похожим составом и тегами."""
+
+        recipe = generics.get_object_or_404(
+            Recipe.objects.only('id'), pk=pk)
+        serializer = self.get_serializer(self.get_queryset().filter(
+            similar_to__recipe=recipe).order_by('-similar_to__score'),
+            many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
-        """Отдает список с ингредиентами."""
-
-        buffer = io.BytesIO()
-        page = canvas.Canvas(buffer)
-        pdfmetrics.registerFont(
-            TTFont('DejaVuSerif', 'DejaVuSerif.ttf', 'UTF-8'))
-        x_position, y_position = 50, 800
-        shopping_cart = (request.user.shopping_cart.recipe.values(
-            'ingredients__name',
-            'ingredients__measurement_unit'
-        ).annotate(amount=Sum('recipe__amount')).order_by())
-        page.setFont('DejaVuSerif', 14)
-        if shopping_cart:
-            indent = 20
-            page.drawString(x_position, y_position, 'Cписок покупок:')
-            for index, recipe in enumerate(shopping_cart, start=1):
-                page.drawString(
-                    x_position, y_position - indent,
-                    f'{index}. {recipe["ingredients__name"]} - '
-                    f'{recipe["amount"]} '
-                    f'{recipe["ingredients__measurement_unit"]}.')
-                y_position -= 15
-                if y_position <= 50:
-                    page.showPage()
-                    y_position = 800
-            page.save()
-            buffer.seek(0)
-            return FileResponse(buffer, as_attachment=True,
-                                filename='shoppingcart.pdf')
-        page.setFont('DejaVuSerif', 24)
-        page.drawString(x_position, y_position, 'Пустой список покупок!')
-        page.save()
-        buffer.seek(0)
-        return FileResponse(buffer, as_attachment=True,
-                            filename='shoppingcart.pdf')
+        """
+        Отдает список с ингредиентами.
+
+        С параметром ?async=1 большой список рисуется в фоне: в ответ
+        приходит выгрузка, статус которой можно запрашивать до появления
+        файла. Без параметра PDF всегда отдается сразу.
+        """
+
+        shopping_cart = get_shopping_cart(request.user)
+        if (request.query_params.get('async') == '1'
+                and len(shopping_cart) > settings.SHOPPING_CART_SYNC_LIMIT):
+            serializer = ShoppingCartJobSerializer(
+                enqueue_job(request.user), context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        return FileResponse(render_shopping_cart(shopping_cart),
+                            as_attachment=True, filename='shoppingcart.pdf')
+
+
+class ShoppingCartJobView(generics.RetrieveAPIView):
+    """Статус фоновой выгрузки списка покупок."""
+
+    serializer_class = ShoppingCartJobSerializer
+    lookup_url_kwarg = 'job_id'
+
+    def get_queryset(self):
+        return self.request.user.shopping_cart_jobs.all()
 
 
 class ControlFavoriteRecipe(GetObjectMixin, generics.RetrieveDestroyAPIView,
@@ -210,12 +348,12 @@ class ControlFavoriteRecipe(GetObjectMixin, generics.RetrieveDestroyAPIView,
 
     def create(self, request, *args, **kwargs):
         isinstance = self.get_object()
-        request.user.favorite_recipe.recipe.add(isinstance)
+        request.user.favorite_recipe.get_or_create(recipe=isinstance)
         serializer = self.get_serializer(isinstance)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_destroy(self, instance):
-        self.request.user.favorite_recipe.recipe.remove(instance)
+        self.request.user.favorite_recipe.filter(recipe=instance).delete()
 
 
 class ControlShoppingCart(GetObjectMixin, generics.RetrieveDestroyAPIView,
@@ -224,12 +362,12 @@ class ControlShoppingCart(GetObjectMixin, generics.RetrieveDestroyAPIView,
 
     def create(self, request, *args, **kwargs):
         isinstance = self.get_object()
-        request.user.shopping_cart.recipe.add(isinstance)
+        request.user.shopping_cart.get_or_create(recipe=isinstance)
         serializer = self.get_serializer(isinstance)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_destroy(self, instance):
-        self.request.user.shopping_cart.recipe.remove(instance)
+        self.request.user.shopping_cart.filter(recipe=instance).delete()
 
 
 class ControlSubscription(generics.RetrieveDestroyAPIView,
@@ -256,8 +394,10 @@ class ControlSubscription(generics.RetrieveDestroyAPIView,
             return Response({'errors': 'Невозможно подписаться на себя.'},
                             status=status.HTTP_400_BAD_REQUEST)
         subscribe = request.user.follower.create(author=instance)
+        backfill(request.user, instance)
         serilizer = self.get_serializer(subscribe)
         return Response(serilizer.data, status=status.HTTP_201_CREATED)
 
     def perform_destroy(self, instance):
         self.request.user.follower.filter(author=instance).delete()
+        prune(self.request.user, instance)
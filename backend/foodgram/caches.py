@@ -0,0 +1,30 @@
+"""
+Проверка, что кеш общий для всех процессов.
+
+Кеш токенов и счетчики ограничения частоты запросов работают
+правильно только с кешем, который видят все воркеры gunicorn
+(Redis, Memcached, база). Локальный кеш процесса для них не подходит.
+"""
+from django.conf import settings
+from django.core import checks
+
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or is_shared_cache():
+        return []
+    return [checks.Warning(
+        'Кеш по умолчанию локальный для процесса: кеш токенов '
+        'отключен, а ограничение частоты запросов считается '
+        'в каждом воркере отдельно.',
+        hint='Укажите CACHE_BACKEND и CACHE_LOCATION общего кеша, '
+             'например Redis.',
+        id='foodgram.W001')]
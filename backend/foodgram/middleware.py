@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from foodgram import routers
+from foodgram.profiling import profile_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'replica_pin'
+PIN_SALT = 'foodgram.replica_pin'
+
+
+def get_request_user(request):
+    """
+    Пользователь запроса по сессии или по заголовку Authorization
+    с токеном; None для анонимного запроса и неверного токена.
+    """
+    if request.user.is_authenticated:
+        return request.user
+    keyword, _, key = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    if keyword != 'Token' or not key:
+        return None
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+def get_pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Отправляет безопасные запросы на реплики, а остальные - в основную
+    базу.
+
+    После успешной записи в небезопасном запросе пользователь
+    на REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы сразу
+    видеть собственные изменения, даже если реплика отстает. Отметка
+    хранится в общем кеше по id пользователя, поэтому действует
+    для клиентов с токеном без кук. Анонимный клиент вместо нее
+    получает подписанную куку: срок проверяется по времени подписи,
+    и продлить его клиент не может.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def is_pinned(self, request, user):
+        if user is not None and cache.get(get_pin_key(user.id)):
+            return True
+        return request.get_signed_cookie(
+            PIN_COOKIE, default=None, salt=PIN_SALT,
+            max_age=settings.REPLICA_PIN_SECONDS) is not None
+
+    def pin(self, response, user):
+        if user is not None:
+            cache.set(
+                get_pin_key(user.id), True, settings.REPLICA_PIN_SECONDS)
+        else:
+            response.set_signed_cookie(
+                PIN_COOKIE, '1', salt=PIN_SALT,
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax')
+
+    def __call__(self, request):
+        user = get_request_user(request)
+        safe = request.method in SAFE_METHODS
+        if safe and not self.is_pinned(request, user):
+            tokens = routers.use_replica()
+        else:
+            tokens = routers.use_primary()
+        try:
+            response = self.get_response(request)
+            if (not safe and routers.has_written()
+                    and response.status_code < 400):
+                self.pin(response, user)
+            return response
+        finally:
+            routers.reset(tokens)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос сотрудника с заголовком X-Profile или параметром
+    profile в строке запроса; id профиля возвращается в X-Profile-Id.
+
+    Для остальных запросов — только проверка заголовка и строки запроса.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def is_staff(self, request):
+        user = get_request_user(request)
+        return user is not None and user.is_staff
+
+    def wants_profile(self, request):
+        return 'HTTP_X_PROFILE' in request.META or (
+            'profile' in request.META.get('QUERY_STRING', '')
+            and 'profile' in request.GET)
+
+    def __call__(self, request):
+        if self.wants_profile(request) and self.is_staff(request):
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
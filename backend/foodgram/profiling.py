@@ -0,0 +1,186 @@
+"""
+Профилирование отдельных запросов.
+
+Профиль (cProfile и SQL-запросы с временем выполнения) сохраняется
+в PROFILE_DIR; хранятся только PROFILE_MAX_FILES последних профилей.
+Просмотр — на странице /admin/profiles/ для сотрудников.
+"""
+import cProfile
+from contextlib import ExitStack
+from datetime import datetime
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.html import format_html, format_html_join
+
+PROFILE_DIR = getattr(
+    settings, 'PROFILE_DIR',
+    os.path.join(tempfile.gettempdir(), 'foodgram-profiles'))
+PROFILE_MAX_FILES = getattr(settings, 'PROFILE_MAX_FILES', 50)
+MAX_QUERIES = 1000
+STATS_LINES = 60
+PROFILE_ID = re.compile(r'^[\w-]+$')
+
+
+def _get_path(profile_id, extension):
+    if not PROFILE_ID.match(profile_id):
+        raise Http404
+    return os.path.join(PROFILE_DIR, f'{profile_id}.{extension}')
+
+
+def _trim():
+    """Удаляет самые старые профили сверх PROFILE_MAX_FILES."""
+    names = sorted(name[:-5] for name in os.listdir(PROFILE_DIR)
+                   if name.endswith('.json'))
+    for profile_id in names[:-PROFILE_MAX_FILES]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(_get_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(data, profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = (
+        f'{datetime.now().strftime("%Y%m%d-%H%M%S-%f")}-{uuid4().hex[:6]}')
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(
+        'cumulative').print_stats(STATS_LINES)
+    data['stats'] = stream.getvalue()
+    profiler.dump_stats(_get_path(profile_id, 'prof'))
+    path = _get_path(profile_id, 'json')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+    _trim()
+    return profile_id
+
+
+def _read_profile(profile_id):
+    """Данные профиля или None, если его уже удалил _trim."""
+    try:
+        with open(_get_path(profile_id, 'json'), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def load_profile(profile_id):
+    data = _read_profile(profile_id)
+    if data is None:
+        raise Http404
+    return data
+
+
+def profile_request(request, get_response):
+    """Выполняет запрос под профилировщиком и сохраняет профиль."""
+    queries = []
+    totals = {'count': 0, 'ms': 0.0}
+
+    def record(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            totals['count'] += 1
+            totals['ms'] += elapsed
+            if len(queries) < MAX_QUERIES:
+                queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'ms': elapsed,
+                })
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration = (time.perf_counter() - started) * 1000
+    profile_id = save_profile({
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': str(request.user),
+        'status': response.status_code,
+        'ms': duration,
+        'sql_count': totals['count'],
+        'sql_ms': totals['ms'],
+        'queries': queries,
+    }, profiler)
+    response['X-Profile-Id'] = profile_id
+    return response
+
+
+def _page(title, body):
+    return HttpResponse(format_html(
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        '<title>{}</title></head><body><h1>{}</h1>{}</body></html>',
+        title, title, body))
+
+
+@staff_member_required
+def profile_list(request):
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            data = _read_profile(name[:-5])
+            if data is not None:
+                profiles.append((name[:-5], data))
+    rows = format_html_join(
+        '', '<tr><td><a href="{}/">{}</a></td><td>{} {}</td><td>{}</td>'
+        '<td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+        ((profile_id, profile_id, data['method'], data['path'],
+          data['user'], data['status'], round(data['ms'], 1),
+          data['sql_count'], round(data['sql_ms'], 1))
+         for profile_id, data in profiles))
+    return _page('Профили запросов', format_html(
+        '<table><tr><th>Профиль</th><th>Запрос</th><th>Пользователь</th>'
+        '<th>Статус</th><th>мс</th><th>SQL</th><th>SQL, мс</th></tr>'
+        '{}</table>', rows))
+
+
+@staff_member_required
+def profile_detail(request, profile_id):
+    data = load_profile(profile_id)
+    if 'download' in request.GET:
+        try:
+            file = open(_get_path(profile_id, 'prof'), 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(
+            file, as_attachment=True, filename=f'{profile_id}.prof')
+    queries = format_html_join(
+        '', '<tr><td>{}</td><td>{}</td><td><code>{}</code><br>'
+        '<small>{}</small></td></tr>',
+        ((round(query['ms'], 2), query['alias'], query['sql'],
+          query['params'])
+         for query in data['queries']))
+    return _page(profile_id, format_html(
+        '<p>{} {} — {}, статус {}, {} мс, SQL: {} запросов, {} мс. '
+        '<a href="?download=1">Скачать .prof</a></p>'
+        '<h2>SQL</h2><table><tr><th>мс</th><th>База</th><th>Запрос</th></tr>'
+        '{}</table><h2>cProfile</h2><pre>{}</pre>',
+        data['method'], data['path'], data['user'], data['status'],
+        round(data['ms'], 1), data['sql_count'], round(data['sql_ms'], 1),
+        queries,
+        data['stats']))
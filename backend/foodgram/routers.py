@@ -0,0 +1,63 @@
+"""
+Маршрутизация запросов к базе между основной базой и репликами.
+
+Чтение уходит на реплику только внутри HTTP-запроса, который
+ReplicaRoutingMiddleware пометил как безопасный. Команды управления,
+фоновые задачи и любые запросы после записи читают из основной базы.
+
+Токены, пользователи и сессии всегда читаются из основной базы:
+только что выданный токен или деактивация пользователя должны
+действовать сразу, а не после того, как их догонит реплика.
+"""
+from contextvars import ContextVar
+import random
+
+from django.conf import settings
+
+PRIMARY_MODELS = {
+    'authtoken.token', 'sessions.session', settings.AUTH_USER_MODEL.lower()}
+
+_replica = ContextVar('replica', default=None)
+_wrote = ContextVar('wrote', default=False)
+
+
+def use_replica():
+    """Направляет чтение текущего запроса на одну из реплик."""
+    return (_replica.set(random.choice(settings.DATABASE_REPLICAS)),
+            _wrote.set(False))
+
+
+def use_primary():
+    return _replica.set(None), _wrote.set(False)
+
+
+def reset(tokens):
+    replica_token, wrote_token = tokens
+    _replica.reset(replica_token)
+    _wrote.reset(wrote_token)
+
+
+def has_written():
+    return _wrote.get()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return 'default'
+        return _replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        # Остаток запроса читает свои записи из основной базы, но
+        # закрепляет клиента только middleware и только после записи
+        # в небезопасном запросе.
+        _replica.set(None)
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -1,4 +1,6 @@
 import os
+import tempfile
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -43,6 +45,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
+    'foodgram.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +85,27 @@ DATABASES = {
 }
 
 
+# Реплики для чтения: DB_REPLICAS - список хостов через запятую
+# (для SQLite - имен файлов базы).
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(',')),
+        start=1):
+    alias = f'replica_{index}'
+    location = 'NAME' if DATABASES['default']['ENGINE'].endswith(
+        'sqlite3') else 'HOST'
+    DATABASES[alias] = dict(
+        DATABASES['default'], **{location: replica.strip()},
+        TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает из основной базы.
+# Закрепление пользователя хранится в кеше по умолчанию и видно
+# всем воркерам только в общем кеше (CACHE_BACKEND).
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=10))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -127,14 +152,90 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+# Кеш по умолчанию должен быть общим для всех воркеров (Redis
+# в docker-compose); локальный кеш процесса годится для разработки.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',),
+        'api.authentication.CachedTokenAuthentication',),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.CostThrottle',),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', default='240/min'),
+        'ip': os.getenv('THROTTLE_IP_RATE', default='600/min'),
+    },
+    # Количество прокси перед приложением (nginx): IP клиента берется
+    # из X-Forwarded-For с учетом только их записей.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
     'DEFAULT_PAGINATION_CLASS': 'api.paginations.LimitPageNumberPagination',
     'PAGE_SIZE': 6,
 }
+
+# Лента подписок: авторы с большим числом подписчиков
+# подмешиваются в ленту при чтении, а не раскладываются при публикации.
+# Список таких авторов пересчитывает команда update_feed_modes.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', default=5000))
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', default=100))
+
+# Время жизни записи token -> пользователь в кеше, секунды.
+# С локальным кешем процесса (LocMemCache) кеш токенов не используется.
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=300))
+
+# Списки покупок с большим числом ингредиентов рисуются в фоне
+# командой render_shopping_carts.
+SHOPPING_CART_SYNC_LIMIT = int(
+    os.getenv('SHOPPING_CART_SYNC_LIMIT', default=100))
+
+# Количество рецептов для пагинации кешируется на PAGE_COUNT_TIMEOUT
+# секунд; для анонимного списка без фильтров в PostgreSQL при таблице
+# больше PAGE_COUNT_ESTIMATE_THRESHOLD строк берется оценка планировщика.
+PAGE_COUNT_TIMEOUT = int(os.getenv('PAGE_COUNT_TIMEOUT', default=60))
+PAGE_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGE_COUNT_ESTIMATE_THRESHOLD', default=10000))
+
+# Список рецептов собирается из values()-запросов без сериализатора.
+RECIPE_LIST_FAST_PATH = os.getenv(
+    'RECIPE_LIST_FAST_PATH', default='True') == 'True'
+
+# Время хранения в кеше не зависящей от пользователя части рецептов
+# в быстром списке, секунды. Ключ включает дату изменения рецепта.
+RECIPE_CARD_TIMEOUT = int(os.getenv('RECIPE_CARD_TIMEOUT', default=3600))
+
+# Количество похожих рецептов, которое хранит для каждого рецепта
+# команда update_similar_recipes.
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', default=10))
+
+# Профилирование запросов сотрудников по заголовку X-Profile
+# или параметру ?profile=1. Хранятся PROFILE_MAX_FILES последних
+# профилей, просмотр на /admin/profiles/. Каталог профилей лежит
+# вне кода, static и media, чтобы профили не попали в образ,
+# collectstatic или раздачу nginx.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='True') == 'True'
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', default=50))
+
+# Бюджет времени старта (django.setup() и загрузка URL), мс;
+# проверяется командой check_startup.
+STARTUP_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', default=1000))
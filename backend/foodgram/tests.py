@@ -0,0 +1,116 @@
+import os
+import sqlite3
+from tempfile import mkstemp
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS
+    and settings.DATABASES['default']['ENGINE'].endswith('sqlite3'),
+    'нужна реплика SQLite: DB_REPLICAS=replica.sqlite3')
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Маршрутизация между основной базой и отстающей репликой.
+
+    В тестах реплика зеркалирует основную базу, поэтому здесь она
+    подменяется копией тестовой базы, снятой до начала тестов: все,
+    что создано в тесте, есть только в основной базе.
+    """
+
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_files = {}
+        connections['default'].ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            connection = connections[alias]
+            handle, path = mkstemp(suffix='.sqlite3')
+            os.close(handle)
+            with sqlite3.connect(path) as replica:
+                connections['default'].connection.backup(replica)
+            cls.replica_files[alias] = (connection.settings_dict['NAME'], path)
+            connection.close()
+            connection.settings_dict['NAME'] = path
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias, (name, path) in cls.replica_files.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+            os.remove(path)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Поваров', password='pass')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Омлет', text='Описание',
+            cooking_time=10)
+        self.client = self.get_client(self.user)
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token = Token.objects.create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def get_recipe_ids(self, client, query=''):
+        client.cookies.clear()
+        response = client.get(f'/api/recipes/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_token_is_read_from_primary(self):
+        self.assertEqual(self.get_recipe_ids(self.client), [])
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.client.get('/api/recipes/').status_code, 401)
+
+    def test_write_pins_user(self):
+        response = self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(
+            self.get_recipe_ids(self.client, '?is_favorited=1'),
+            [self.recipe.id])
+        other = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Рецептов', password='pass')
+        self.assertEqual(self.get_recipe_ids(self.get_client(other)), [])
+        self.assertEqual(self.get_recipe_ids(self.get_client()), [])
+
+    def test_write_in_safe_request_does_not_pin(self):
+        def write(request):
+            Tag.objects.create(name='Завтрак', color='#E26C2D', slug='tag')
+            return HttpResponse()
+
+        request = RequestFactory().get('/api/recipes/')
+        request.user = self.user
+        response = ReplicaRoutingMiddleware(write)(request)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertFalse(
+            ReplicaRoutingMiddleware(write).is_pinned(request, self.user))
+
+    def test_replica_count_is_not_reused(self):
+        self.assertEqual(self.get_recipe_ids(self.get_client()), [])
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(
+            self.get_recipe_ids(self.client), [self.recipe.id])
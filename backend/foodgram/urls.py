@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from foodgram.profiling import profile_detail, profile_list
+
 urlpatterns = [
+    path('admin/profiles/', profile_list, name='profile_list'),
+    path('admin/profiles/<str:profile_id>/', profile_detail,
+         name='profile_detail'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls', namespace='api')),
 ]
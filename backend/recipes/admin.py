@@ -3,6 +3,7 @@ from django.contrib import admin
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart,
                             Subscription, Tag)
+from recipes.signals import recipe_ingredients_changed
 
 
 class RecipeIngredient(admin.StackedInline):
@@ -21,6 +22,11 @@ class Recipe(admin.ModelAdmin):
     inlines = (RecipeIngredient,)
     empty_value_display = '-пусто-'
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_ingredients_changed.send(
+            sender=form.instance._meta.model, instance=form.instance)
+
     @admin.display(description='Электронная почта автора')
     def get_author(self, obj):
         return obj.author.email
@@ -67,28 +73,13 @@ class Subscription(admin.ModelAdmin):
 
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'get_recipe', 'get_count')
+    list_display = ('id', 'user', 'recipe', 'created',)
+    search_fields = ('user__email', 'recipe__name',)
     empty_value_display = '-пусто-'
 
-    @admin.display(description='Рецепты')
-    def get_recipe(self, obj):
-        return [f'{item["name"]} ' for item in obj.recipe.values('name')[:5]]
-
-    @admin.display(
-        description='В избранных')
-    def get_count(self, obj):
-        return obj.recipe.count()
-
 
 @admin.register(ShoppingCart)
 class SoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'get_recipe', 'get_count')
+    list_display = ('id', 'user', 'recipe', 'created',)
+    search_fields = ('user__email', 'recipe__name',)
     empty_value_display = '-пусто-'
-
-    @admin.display(description='Рецепты')
-    def get_recipe(self, obj):
-        return [f'{item["name"]} ' for item in obj.recipe.values('name')[:5]]
-
-    @admin.display(description='В избранных')
-    def get_count(self, obj):
-        return obj.recipe.count()
@@ -0,0 +1,82 @@
+"""
+Снимок справочника ингредиентов для раздачи через nginx.
+
+Каталог записывается в MEDIA_ROOT/catalog/ как JSON с хешем содержимого
+в имени файла и заранее сжатой копией .gz для gzip_static в nginx.
+Имя текущего снимка хранится в манифесте, который отдает API.
+"""
+import gzip
+from hashlib import sha256
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from recipes.models import Ingredient
+
+CATALOG_DIR = 'catalog'
+MANIFEST_NAME = 'ingredients-manifest.json'
+KEEP_SNAPSHOTS = 3
+
+
+def get_catalog_root():
+    return os.path.join(settings.MEDIA_ROOT, CATALOG_DIR)
+
+
+def _write(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def _remove_old_snapshots(root, current):
+    snapshots = sorted(
+        (entry for entry in os.scandir(root)
+         if entry.name.startswith('ingredients.')
+         and entry.name.endswith('.json') and entry.name != current),
+        key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in snapshots[KEEP_SNAPSHOTS - 1:]:
+        # .br оставались от прежних сборок каталога.
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(entry.path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def build_catalog():
+    """Записывает снимок каталога и возвращает манифест."""
+    data = json.dumps(
+        list(Ingredient.objects.values('id', 'name', 'measurement_unit')),
+        ensure_ascii=False, separators=(',', ':')).encode()
+    version = sha256(data).hexdigest()[:16]
+    name = f'ingredients.{version}.json'
+    root = get_catalog_root()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, name)
+    if not os.path.exists(path):
+        _write(f'{path}.gz', gzip.compress(data, 9, mtime=0))
+        _write(path, data)
+    manifest = {
+        'version': version,
+        'path': f'{CATALOG_DIR}/{name}',
+        'size': len(data),
+    }
+    _write(os.path.join(root, MANIFEST_NAME), json.dumps(manifest).encode())
+    _remove_old_snapshots(root, name)
+    return manifest
+
+
+def get_catalog_manifest():
+    try:
+        with open(os.path.join(get_catalog_root(), MANIFEST_NAME)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return build_catalog()
+
+
+def schedule_catalog_build():
+    """Пересобирает каталог после фиксации транзакции."""
+    transaction.on_commit(build_catalog)
@@ -0,0 +1,158 @@
+"""
+Лента рецептов от авторов, на которых подписан пользователь.
+
+Новые рецепты раскладываются по лентам подписчиков при публикации
+(fan-out-on-write). Для авторов, у которых подписчиков больше
+FEED_FANOUT_LIMIT, раскладка слишком дорогая: их рецепты подмешиваются
+в ленту при чтении (fan-out-on-read).
+
+Такие авторы хранятся в FeedPullAuthor, список пересчитывает команда
+update_feed_modes. Когда у автора становится меньше подписчиков,
+последние его рецепты раскладываются по лентам, иначе опубликованное
+за время подмешивания из ленты пропало бы.
+"""
+from collections import defaultdict
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from recipes.models import FeedEntry, FeedPullAuthor, Recipe, Subscription
+
+FANOUT_LIMIT = getattr(settings, 'FEED_FANOUT_LIMIT', 5000)
+BACKFILL_LIMIT = getattr(settings, 'FEED_BACKFILL_LIMIT', 100)
+BATCH_SIZE = 1000
+READ_AUTHORS_KEY = 'feed_fanout_on_read_authors'
+READ_AUTHORS_TIMEOUT = 300
+
+
+def refresh_fanout_modes():
+    """
+    Пересчитывает авторов, чьи рецепты подмешиваются при чтении,
+    и раскладывает рецепты авторов, вернувшихся к раскладке.
+    Возвращает количество добавленных и удаленных авторов.
+    """
+    current = set(Subscription.objects.values(
+        'author_id').annotate(followers=Count('id')).filter(
+        followers__gt=FANOUT_LIMIT).values_list('author_id', flat=True))
+    stored = set(FeedPullAuthor.objects.values_list('author_id', flat=True))
+    FeedPullAuthor.objects.bulk_create(
+        (FeedPullAuthor(author_id=author_id)
+         for author_id in current - stored), ignore_conflicts=True)
+    for author_id in stored - current:
+        # Раскладывает тот процесс, который удалил запись.
+        if FeedPullAuthor.objects.filter(author_id=author_id).delete()[0]:
+            _backfill_followers(author_id)
+    cache.delete(READ_AUTHORS_KEY)
+    return len(current - stored), len(stored - current)
+
+
+def get_fanout_on_read_authors():
+    """Авторы, чьи рецепты подмешиваются в ленту при чтении."""
+    authors = cache.get(READ_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(FeedPullAuthor.objects.values_list(
+            'author_id', flat=True))
+        cache.set(READ_AUTHORS_KEY, authors, READ_AUTHORS_TIMEOUT)
+    return authors
+
+
+def is_fanout_on_read(author_id):
+    """Проверка по базе, а не по кешу: используется при записи."""
+    return FeedPullAuthor.objects.filter(author_id=author_id).exists()
+
+
+def _create_entries(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_recipes(recipes):
+    """Добавляет новые рецепты в ленты подписчиков их авторов."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    pull_authors = set(FeedPullAuthor.objects.filter(
+        author_id__in=by_author).values_list('author_id', flat=True))
+    _create_entries(
+        FeedEntry(user_id=user_id, author_id=author_id,
+                  recipe_id=recipe.id, pub_date=recipe.pub_date)
+        for author_id, author_recipes in by_author.items()
+        if author_id not in pull_authors
+        for user_id in Subscription.objects.filter(
+            author_id=author_id).values_list(
+            'user_id', flat=True).iterator()
+        for recipe in author_recipes)
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    fan_out_recipes([recipe])
+
+
+def _get_latest_recipes(author_id):
+    return list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:BACKFILL_LIMIT])
+
+
+def _backfill_followers(author_id):
+    recipes = _get_latest_recipes(author_id)
+    _create_entries(
+        FeedEntry(user_id=user_id, author_id=author_id,
+                  recipe_id=recipe_id, pub_date=pub_date)
+        for user_id in Subscription.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True).iterator()
+        for recipe_id, pub_date in recipes)
+
+
+def backfill(user, author):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if is_fanout_on_read(author.id):
+        return
+    _create_entries(
+        FeedEntry(user_id=user.id, author_id=author.id,
+                  recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in _get_latest_recipes(author.id))
+
+
+def prune(user, author):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def _after(cursor, date_field, id_field):
+    if cursor is None:
+        return Q()
+    pub_date, recipe_id = cursor
+    return (Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': recipe_id}))
+
+
+def get_feed(user, cursor=None, limit=10):
+    """
+    Возвращает до limit пар (pub_date, id рецепта) из ленты, начиная
+    после курсора (pub_date, id) в порядке от новых к старым.
+    """
+    read_authors = list(user.follower.filter(
+        author_id__in=get_fanout_on_read_authors()).values_list(
+        'author_id', flat=True))
+    # Записи авторов, рецепты которых подмешиваются при чтении, могли
+    # остаться в ленте с тех пор, как их раскладывали. Они исключаются,
+    # чтобы потоки не пересекались и страница была полной.
+    stored = FeedEntry.objects.filter(
+        _after(cursor, 'pub_date', 'recipe_id'), user=user
+    ).exclude(author_id__in=read_authors).order_by(
+        '-pub_date', '-recipe_id').values_list('pub_date', 'recipe_id')[:limit]
+    streams = [list(stored)]
+    if read_authors:
+        streams.append(list(Recipe.objects.filter(
+            _after(cursor, 'pub_date', 'id'), author_id__in=read_authors
+        ).order_by('-pub_date', '-id').values_list('pub_date', 'id')[:limit]))
+    return list(islice(heapq.merge(*streams, reverse=True), limit))
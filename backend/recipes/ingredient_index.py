@@ -0,0 +1,150 @@
+"""Инвертированный индекс ингредиент -> рецепты для поиска по продуктам."""
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from recipes.models import IngredientIndexChange, RecipeIngredient
+from recipes.versions import INGREDIENT_INDEX, bump_version, get_version
+
+# Сколько последних изменений хранится для догоняющих процессов.
+# Процесс, отставший сильнее, перестраивает индекс целиком.
+MAX_CHANGES = getattr(settings, 'INGREDIENT_INDEX_MAX_CHANGES', 10000)
+
+
+def _recipe_ingredients():
+    # Версия читается из основной базы, поэтому и состав рецептов
+    # тоже: с отстающей реплики индекс получил бы новую версию
+    # со старыми данными.
+    return RecipeIngredient.objects.using(DEFAULT_DB_ALIAS)
+
+
+class IngredientIndex:
+    """
+    Хранит в памяти процесса отсортированные списки id рецептов
+    для каждого ингредиента и состав каждого рецепта.
+
+    Каждое изменение состава рецепта увеличивает версию
+    INGREDIENT_INDEX и записывает id рецепта в IngredientIndexChange.
+    Остальные процессы перед запросом сверяют версию и перечитывают
+    состав только измененных рецептов. Индекс перестраивается целиком
+    при первом запросе, после invalidate() и при отставании больше
+    чем на MAX_CHANGES изменений.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._compositions = None
+        self._version = None
+
+    def _build(self, version):
+        postings = {}
+        compositions = {}
+        for recipe_id, ingredient_id in _recipe_ingredients().order_by(
+                'recipe_id').values_list(
+                'recipe_id', 'ingredient_id').iterator():
+            postings.setdefault(ingredient_id, array('L')).append(recipe_id)
+            compositions.setdefault(recipe_id, array('L')).append(
+                ingredient_id)
+        self._postings = postings
+        self._compositions = compositions
+        self._version = version
+
+    def _catch_up(self, version):
+        """Применяет изменения после своей версии или перестраивает."""
+        behind = version - self._version
+        changes = [] if behind > MAX_CHANGES else list(
+            IngredientIndexChange.objects.using(DEFAULT_DB_ALIAS).filter(
+                version__gt=self._version, version__lte=version
+            ).values_list('recipe_id', flat=True))
+        if len(changes) != behind:
+            # Часть изменений удалена или версию увеличил invalidate().
+            self._build(version)
+            return
+        recipe_ids = set(changes)
+        compositions = defaultdict(list)
+        for recipe_id, ingredient_id in _recipe_ingredients().filter(
+                recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'ingredient_id'):
+            compositions[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            self._replace(recipe_id, sorted(compositions[recipe_id]))
+        self._version = version
+
+    def _refresh(self, version):
+        if self._postings is None:
+            self._build(version)
+        elif version > self._version:
+            self._catch_up(version)
+
+    def _replace(self, recipe_id, ingredient_ids):
+        for ingredient_id in self._compositions.pop(recipe_id, ()):
+            posting = self._postings[ingredient_id]
+            position = bisect_left(posting, recipe_id)
+            if position < len(posting) and posting[position] == recipe_id:
+                del posting[position]
+        if ingredient_ids:
+            self._compositions[recipe_id] = array('L', ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                insort(self._postings.setdefault(
+                    ingredient_id, array('L')), recipe_id)
+
+    def _apply(self, recipe_id, ingredient_ids):
+        with self._lock:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                version = bump_version(INGREDIENT_INDEX)
+                changes = IngredientIndexChange.objects.using(
+                    DEFAULT_DB_ALIAS)
+                changes.create(version=version, recipe_id=recipe_id)
+                changes.filter(version__lte=version - MAX_CHANGES).delete()
+            # Если между версиями были чужие изменения, индекс догонит
+            # их вместе с этим при следующем запросе.
+            if self._postings is not None and version == self._version + 1:
+                self._replace(recipe_id, ingredient_ids)
+                self._version = version
+
+    def update_recipe(self, recipe_id):
+        """Обновляет состав рецепта после сохранения ингредиентов."""
+        self._apply(recipe_id, sorted(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', flat=True)))
+
+    def remove_recipe(self, recipe_id):
+        self._apply(recipe_id, ())
+
+    def invalidate(self):
+        """
+        Заставляет все процессы перестроить индекс: после импорта
+        и удаления ингредиента, когда меняется состав многих рецептов.
+        """
+        with self._lock:
+            bump_version(INGREDIENT_INDEX)
+            self._postings = None
+
+    def cover(self, ingredient_ids, missing=0):
+        """
+        Возвращает рецепты, в которых не хватает не больше missing
+        ингредиентов, в виде списка (id, доля покрытия, не хватает).
+
+        Список отсортирован по убыванию доли покрытия.
+        """
+        version = get_version(INGREDIENT_INDEX)
+        hits = Counter()
+        result = []
+        with self._lock:
+            self._refresh(version)
+            for ingredient_id in set(ingredient_ids):
+                hits.update(self._postings.get(ingredient_id, ()))
+            for recipe_id, covered in hits.items():
+                size = len(self._compositions.get(recipe_id, ()))
+                if size and size - covered <= missing:
+                    result.append(
+                        (recipe_id, covered / size, size - covered))
+        result.sort(key=lambda item: (-item[1], item[2], -item[0]))
+        return result
+
+
+ingredient_index = IngredientIndex()
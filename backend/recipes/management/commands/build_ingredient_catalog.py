@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from recipes.catalog import build_catalog
+
+
+class Command(BaseCommand):
+    help = 'Сборка сжатого снимка справочника ингредиентов'
+
+    def handle(self, *args, **kwargs):
+        manifest = build_catalog()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок ингредиентов {manifest["path"]} собран!'))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+
+from recipes.media import BATCH_SIZE, collect_orphaned_images
+
+
+class Command(BaseCommand):
+    help = 'Удаление изображений рецептов, на которые нет ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Не трогать файлы моложе этого количества часов')
+        parser.add_argument(
+            '--quarantine', action='store_true',
+            help='Переносить файлы в media/quarantine вместо удаления')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать файлы, ничего не удаляя')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество файлов, проверяемых одним запросом')
+
+    def handle(self, *args, **options):
+        count, size = collect_orphaned_images(
+            timedelta(hours=options['grace_hours']), options['quarantine'],
+            options['dry_run'], options['batch_size'])
+
+        action = 'Найдено' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {count}, {size / 1024 / 1024:.1f} МБ '
+            f'({size} байт)'))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management import BaseCommand
+
+from recipes.transfer import BATCH_SIZE, export_recipes
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка рецептов в файл JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или - для вывода в stdout')
+        parser.add_argument(
+            '--after-id', type=int, default=0,
+            help='Продолжить выгрузку после рецепта с этим id, '
+                 'дописывая файл')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            export_recipes(
+                sys.stdout, options['after_id'], options['batch_size'])
+            return
+        with open(options['path'], 'a' if options['after_id'] else 'w',
+                  encoding='utf-8') as file:
+            exported, last_id = export_recipes(
+                file, options['after_id'], options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exported}, последний id: {last_id}'))
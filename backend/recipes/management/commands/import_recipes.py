@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.transfer import BATCH_SIZE, import_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка рецептов из файла JSON Lines. Уже загруженные рецепты '
+        'пропускаются, поэтому прерванную загрузку можно повторить. '
+        'Файлы изображений нужно перенести отдельно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или - для чтения из stdin')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество рецептов в одной транзакции')
+
+    def progress(self, read, created):
+        self.stdout.write(f'Прочитано: {read}, создано: {created}')
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                read, created = import_recipes(
+                    sys.stdin, options['batch_size'], self.progress)
+            else:
+                with open(options['path'], encoding='utf-8') as file:
+                    read, created = import_recipes(
+                        file, options['batch_size'], self.progress)
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена! Прочитано: {read}, создано: {created}'))
@@ -3,6 +3,7 @@ import csv
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from recipes.catalog import build_catalog
 from recipes.models import Ingredient
 
 
@@ -17,6 +18,7 @@ class Command(BaseCommand):
             reader = csv.DictReader(file)
             Ingredient.objects.bulk_create(
                 Ingredient(**data) for data in reader)
+        build_catalog()
 
         self.stdout.write(self.style.SUCCESS(
             'Загрузка ингредиентов выполнена успешно!'))
@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import BATCH_SIZE, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересчет поисковых данных рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        rebuild_search_index(Recipe, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Поисковые данные рецептов пересчитаны!'))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.shopping_cart import (claim_job, delete_expired_jobs,
+                                   fail_stale_jobs, run_job)
+
+
+class Command(BaseCommand):
+    help = 'Отрисовка больших списков покупок из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать очередь и завершиться')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, секунды')
+        parser.add_argument(
+            '--keep-hours', type=int, default=24,
+            help='Сколько часов хранить готовые файлы')
+        parser.add_argument(
+            '--stale-minutes', type=int, default=30,
+            help='Через сколько минут выполнения выгрузка считается '
+                 'брошенной упавшим воркером')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['keep_hours'])
+        stale = timedelta(minutes=options['stale_minutes'])
+        while True:
+            job = claim_job()
+            if job is not None:
+                run_job(job)
+                self.stdout.write(f'Выгрузка {job.id}: {job.status}')
+                continue
+            fail_stale_jobs(stale)
+            delete_expired_jobs(max_age)
+            if options['once']:
+                return
+            time.sleep(options['interval'])
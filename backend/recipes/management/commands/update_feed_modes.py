@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from recipes.feed import refresh_fanout_modes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет авторов, чьи рецепты подмешиваются в ленту при чтении. '
+        'Рецепты авторов, вернувшихся к раскладке, добавляются в ленты '
+        'подписчиков.')
+
+    def handle(self, *args, **options):
+        added, removed = refresh_fanout_modes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Режимы ленты пересчитаны! Переведено на подмешивание '
+            f'при чтении: {added}, возвращено к раскладке: {removed}'))
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from recipes.popularity import BATCH_SIZE, recompute_popularity
+
+
+class Command(BaseCommand):
+    help = 'Пересчет популярности рецептов с учетом их возраста'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        recompute_popularity(options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Популярность рецептов пересчитана!'))
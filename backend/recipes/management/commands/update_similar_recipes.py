@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from recipes.similarity import BATCH_SIZE, COUNT, refresh_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Пересчет похожих рецептов для измененных рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать похожие рецепты для всех рецептов')
+        parser.add_argument(
+            '--count', type=int, default=COUNT,
+            help='Количество похожих рецептов для каждого рецепта')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_similar_recipes(
+            options['full'], options['count'], options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны для {refreshed} рецептов!'))
@@ -0,0 +1,85 @@
+"""Поиск и удаление изображений рецептов, на которые нет ссылок."""
+import os
+import shutil
+import time
+
+from django.conf import settings
+
+from recipes.models import Recipe
+
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to
+QUARANTINE_DIR = 'quarantine'
+BATCH_SIZE = 1000
+
+
+def _scan(path):
+    """Обходит каталог, не собирая список файлов в памяти."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def _old_files(root, grace):
+    deadline = time.time() - grace.total_seconds()
+    for entry in _scan(os.path.join(root, IMAGES_DIR)):
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime < deadline:
+            name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            yield name, stat.st_size
+
+
+def _chunks(files, size):
+    batch = []
+    for file in files:
+        batch.append(file)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _collect_batch(root, files, quarantine, dry_run):
+    referenced = set(Recipe.objects.filter(
+        image__in=[name for name, _ in files]).values_list(
+        'image', flat=True).iterator())
+    count = size = 0
+    for name, file_size in files:
+        if name in referenced:
+            continue
+        path = os.path.join(root, name)
+        if not dry_run:
+            if quarantine:
+                target = os.path.join(root, QUARANTINE_DIR, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+        count += 1
+        size += file_size
+    return count, size
+
+
+def collect_orphaned_images(grace, quarantine=False, dry_run=False,
+                            batch_size=BATCH_SIZE):
+    """
+    Удаляет или переносит в media/quarantine изображения рецептов
+    старше grace, на которые не ссылается ни один рецепт.
+
+    Файлы проверяются пачками по batch_size одним запросом к индексу
+    по Recipe.image, поэтому память не зависит от количества файлов.
+    Возвращает количество файлов и освобожденных байт.
+    """
+    root = settings.MEDIA_ROOT
+    if not os.path.isdir(os.path.join(root, IMAGES_DIR)):
+        return 0, 0
+    count = size = 0
+    for batch in _chunks(_old_files(root, grace), batch_size):
+        batch_count, batch_bytes = _collect_batch(
+            root, batch, quarantine, dry_run)
+        count += batch_count
+        size += batch_bytes
+    return count, size
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+MODELS = (
+    ('LegacyFavoriteRecipe', 'FavoriteRecipe'),
+    ('LegacyShoppingCart', 'ShoppingCart'),
+)
+
+
+def forwards(apps, schema_editor):
+    """Разворачивает контейнеры пользователей в строки (user, recipe)."""
+    for legacy_name, model_name in MODELS:
+        through = apps.get_model('recipes', legacy_name).recipe.through
+        model = apps.get_model('recipes', model_name)
+        container_field = f'{legacy_name.lower()}__user_id'
+        rows = through.objects.filter(
+            **{f'{container_field}__isnull': False}
+        ).values_list(container_field, 'recipe_id').distinct().iterator()
+        batch = []
+        for user_id, recipe_id in rows:
+            batch.append(model(user_id=user_id, recipe_id=recipe_id))
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+
+def backwards(apps, schema_editor):
+    """Собирает строки (user, recipe) обратно в контейнеры."""
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    for legacy_name, model_name in MODELS:
+        legacy = apps.get_model('recipes', legacy_name)
+        model = apps.get_model('recipes', model_name)
+        containers = {}
+        batch = []
+        for user_id, recipe_id in model.objects.values_list(
+                'user_id', 'recipe_id').order_by('user_id').iterator():
+            if user_id not in containers:
+                containers[user_id] = legacy.objects.create(
+                    user_id=user_id).id
+            batch.append(legacy.recipe.through(
+                **{f'{legacy_name.lower()}_id': containers[user_id],
+                   'recipe_id': recipe_id}))
+            if len(batch) >= BATCH_SIZE:
+                legacy.recipe.through.objects.bulk_create(batch)
+                batch = []
+        legacy.recipe.through.objects.bulk_create(batch)
+        legacy.objects.bulk_create(
+            legacy(user_id=user_id)
+            for user_id in user_model.objects.exclude(
+                id__in=legacy.objects.values('user_id')
+            ).values_list('id', flat=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_flatten_favorite_and_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_copy_favorite_and_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='LegacyFavoriteRecipe',
+        ),
+        migrations.DeleteModel(
+            name='LegacyShoppingCart',
+        ),
+    ]
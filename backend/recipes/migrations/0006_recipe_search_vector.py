@@ -0,0 +1,81 @@
+# Generated by Django 4.1.6 on 2026-10-19 17:45
+
+from collections import defaultdict
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import Value
+
+GIN_INDEX = 'recipes_recipe_search_vector_gin'
+SEARCH_CONFIG = 'russian'
+BATCH_SIZE = 500
+
+
+def fill_search_batch(apps, recipe_ids, postgresql):
+    """
+    Копия логики recipes.search на момент миграции, чтобы миграция
+    не зависела от текущего кода приложения.
+    """
+    recipe_model = apps.get_model('recipes', 'Recipe')
+    through_model = apps.get_model('recipes', 'RecipeIngredient')
+    ingredients = defaultdict(list)
+    for recipe_id, name in through_model.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+            'recipe_id', 'ingredient__name').order_by('ingredient__name'):
+        ingredients[recipe_id].append(name)
+    for recipe_id, name, text in recipe_model.objects.filter(
+            id__in=recipe_ids).values_list('id', 'name', 'text'):
+        composition = ' '.join(ingredients[recipe_id])
+        fields = {'search_document': '\n'.join(
+            (name, composition, text)).lower()}
+        if postgresql:
+            fields['search_vector'] = (
+                SearchVector(Value(name), weight='A', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Value(composition), weight='B', config=SEARCH_CONFIG)
+                + SearchVector(Value(text), weight='C', config=SEARCH_CONFIG))
+        recipe_model.objects.filter(id=recipe_id).update(**fields)
+
+
+def create_search_index(apps, schema_editor):
+    postgresql = schema_editor.connection.vendor == 'postgresql'
+    if postgresql:
+        schema_editor.execute(
+            f'CREATE INDEX {GIN_INDEX} ON recipes_recipe '
+            f'USING gin (search_vector)')
+    recipe_model = apps.get_model('recipes', 'Recipe')
+    last_id = 0
+    while True:
+        batch = list(recipe_model.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not batch:
+            return
+        fill_search_batch(apps, batch, postgresql)
+        last_id = batch[-1]
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_delete_legacy_favorite_and_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='поисковый текст'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.1.6 on 2026-10-19 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_LIMIT = 100
+
+
+def backfill_feed(apps, schema_editor):
+    """Заполняет ленты по уже существующим подпискам."""
+    subscription = apps.get_model('recipes', 'Subscription')
+    recipe = apps.get_model('recipes', 'Recipe')
+    feed_entry = apps.get_model('recipes', 'FeedEntry')
+    for user_id, author_id in list(subscription.objects.values_list(
+            'user_id', 'author_id')):
+        feed_entry.objects.bulk_create(
+            feed_entry(user_id=user_id, author_id=author_id,
+                       recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipe.objects.filter(
+                author_id=author_id).order_by('-pub_date').values_list(
+                'id', 'pub_date')[:BACKFILL_LIMIT])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='подписчик')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'записи ленты',
+                'ordering': ('-pub_date', '-recipe_id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(backfill_feed, migrations.RunPython.noop),
+    ]
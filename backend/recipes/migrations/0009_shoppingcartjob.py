@@ -0,0 +1,37 @@
+# Generated by Django 4.1.6 on 2026-10-19 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='статус')),
+                ('file', models.FileField(blank=True, upload_to='shopping_carts/', verbose_name='файл')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='дата завершения')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_jobs', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'выгрузка списка покупок',
+                'verbose_name_plural': 'выгрузки списков покупок',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcartjob',
+            index=models.Index(fields=['status', 'id'], name='shopping_cart_job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.1.6 on 2026-10-19 17:59
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+BASE_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+CART_WEIGHT = 1.0
+GRAVITY = 1.5
+BATCH_SIZE = 1000
+
+
+def count_by_recipe(model, recipe_ids):
+    return dict(model.objects.filter(recipe_id__in=recipe_ids).values(
+        'recipe_id').annotate(count=Count('id')).values_list(
+        'recipe_id', 'count'))
+
+
+def fill_popularity(apps, schema_editor):
+    """
+    Копия recipes.popularity.recompute_popularity на момент миграции,
+    чтобы миграция не зависела от текущего кода приложения.
+    """
+    recipe_model = apps.get_model('recipes', 'Recipe')
+    favorites_model = apps.get_model('recipes', 'FavoriteRecipe')
+    cart_model = apps.get_model('recipes', 'ShoppingCart')
+    now = timezone.now()
+    last_id = 0
+    while True:
+        recipes = list(recipe_model.objects.filter(id__gt=last_id).order_by(
+            'id').only('id', 'pub_date', 'popularity')[:BATCH_SIZE])
+        if not recipes:
+            return
+        recipe_ids = [recipe.id for recipe in recipes]
+        favorites = count_by_recipe(favorites_model, recipe_ids)
+        carts = count_by_recipe(cart_model, recipe_ids)
+        for recipe in recipes:
+            age = (now - recipe.pub_date).total_seconds() / 3600
+            recipe.popularity = (
+                BASE_WEIGHT + FAVORITE_WEIGHT * favorites.get(recipe.id, 0)
+                + CART_WEIGHT * carts.get(recipe.id, 0)
+            ) / (max(age, 0) + 2) ** GRAVITY
+        recipe_model.objects.bulk_update(recipes, ('popularity',))
+        last_id = recipe_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_shoppingcartjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, verbose_name='популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-pub_date'], name='recipe_popularity_idx'),
+        ),
+        migrations.RunPython(fill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.6 on 2026-10-19 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='static/recipes/', verbose_name='изображение'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.6 on 2026-10-19 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_name_prefix_indexes'),
+        ('recipes', '0012_recipe_image_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedPullAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+            ],
+            options={
+                'verbose_name': 'автор без раскладки по лентам',
+                'verbose_name_plural': 'авторы без раскладки по лентам',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.6 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_feedpullauthor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcartjob',
+            name='started',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата начала'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.6 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientIndexChange',
+            fields=[
+                ('version', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='версия индекса')),
+                ('recipe_id', models.PositiveIntegerField(verbose_name='id рецепта')),
+            ],
+            options={
+                'verbose_name': 'изменение индекса ингредиентов',
+                'verbose_name_plural': 'изменения индекса ингредиентов',
+            },
+        ),
+    ]
@@ -1,8 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 
 User = get_user_model()
 
@@ -39,7 +38,8 @@ class Recipe(models.Model):
         User, on_delete=models.CASCADE,
         related_name='recipe', verbose_name='автор')
     name = models.CharField('название рецепта', max_length=250)
-    image = models.ImageField('изображение', upload_to='static/recipes/')
+    image = models.ImageField(
+        'изображение', upload_to='static/recipes/', db_index=True)
     text = models.TextField('текстовое описание')
     ingredients = models.ManyToManyField(
         Ingredient, through='RecipeIngredient')
@@ -50,11 +50,24 @@ class Recipe(models.Model):
         validators=[validators.MinValueValidator(
             1, message='Не меньше 1 минуты'), ])
     pub_date = models.DateTimeField('дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'дата изменения', auto_now=True, db_index=True)
+    popularity = models.FloatField('популярность', default=0)
+    similar_updated_at = models.DateTimeField(
+        'дата пересчета похожих', null=True, editable=False)
+    search_vector = SearchVectorField(
+        'поисковый вектор', null=True, editable=False)
+    search_document = models.TextField(
+        'поисковый текст', blank=True, editable=False)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-popularity', '-pub_date'],
+                name='recipe_popularity_idx')]
 
     def __str__(self):
         return f'{self.author.email}, {self.name}'
@@ -104,47 +117,189 @@ class Subscription(models.Model):
 
 
 class FavoriteRecipe(models.Model):
-    user = models.OneToOneField(
-        User, on_delete=models.CASCADE, null=True,
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
         related_name='favorite_recipe',
         verbose_name='пользователь')
-    recipe = models.ManyToManyField(
-        Recipe, related_name='favorite_recipe',
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='favorite_recipe',
         verbose_name='избранный рецепт')
+    created = models.DateTimeField('дата добавления', auto_now_add=True)
 
     class Meta:
+        ordering = ['-id']
         verbose_name = 'избранный рецепт'
         verbose_name_plural = 'избранные рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_favorite_recipe')]
 
     def __str__(self):
-        list_ = [item['name'] for item in self.recipe.values('name')]
-        return f'{self.user} добавил {list_} в избранное.'
-
-    @receiver(post_save, sender=User)
-    def create_shopping_cart(sender, instance, created, **kwargs):
-        if created:
-            return FavoriteRecipe.objects.create(user=instance)
+        return f'{self.user} добавил {self.recipe.name} в избранное.'
 
 
 class ShoppingCart(models.Model):
-    user = models.OneToOneField(
-        User, on_delete=models.CASCADE, null=True,
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
         related_name='shopping_cart',
         verbose_name='пользователь')
-    recipe = models.ManyToManyField(
-        Recipe, related_name='shopping_cart',
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='shopping_cart',
         verbose_name='покупка')
+    created = models.DateTimeField('дата добавления', auto_now_add=True)
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'покупка продукта'
         verbose_name_plural = 'покупка продуктов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_shopping_cart')]
 
     def __str__(self):
-        list_ = [item['name'] for item in self.recipe.values('name')]
-        return f'{self.user} добавил {list_} в список покупок.'
+        return f'{self.user} добавил {self.recipe.name} в список покупок.'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='подписчик')
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор')
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рецепт')
+    pub_date = models.DateTimeField('дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-recipe_id')
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry')]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx')]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте {self.user}'
+
+
+class FeedPullAuthor(models.Model):
+    """Автор, чьи рецепты подмешиваются в ленту при чтении."""
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='автор')
+
+    class Meta:
+        verbose_name = 'автор без раскладки по лентам'
+        verbose_name_plural = 'авторы без раскладки по лентам'
 
-    @receiver(post_save, sender=User)
-    def create_shopping_cart(sender, instance, created, **kwargs):
-        if created:
-            return ShoppingCart.objects.create(user=instance)
+    def __str__(self):
+        return str(self.author_id)
+
+
+class DataVersion(models.Model):
+    """Версия данных для сброса кешей во всех процессах."""
+    key = models.CharField('ключ', max_length=100, primary_key=True)
+    value = models.BigIntegerField('версия')
+
+    class Meta:
+        verbose_name = 'версия данных'
+        verbose_name_plural = 'версии данных'
+
+    def __str__(self):
+        return f'{self.key}: {self.value}'
+
+
+class IngredientIndexChange(models.Model):
+    """
+    Рецепт, состав которого изменился в версии индекса ингредиентов:
+    по этим записям процессы догоняют индекс без полной пересборки.
+    """
+    version = models.BigIntegerField('версия индекса', primary_key=True)
+    recipe_id = models.PositiveIntegerField('id рецепта')
+
+    class Meta:
+        verbose_name = 'изменение индекса ингредиентов'
+        verbose_name_plural = 'изменения индекса ингредиентов'
+
+    def __str__(self):
+        return f'{self.version}: {self.recipe_id}'
+
+
+class ShoppingCartJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_cart_jobs',
+        verbose_name='пользователь')
+    status = models.CharField(
+        'статус', max_length=10, choices=STATUSES, default=PENDING)
+    file = models.FileField(
+        'файл', upload_to='shopping_carts/', blank=True)
+    error = models.TextField('ошибка', blank=True)
+    created = models.DateTimeField('дата создания', auto_now_add=True)
+    started = models.DateTimeField('дата начала', null=True, blank=True)
+    finished = models.DateTimeField('дата завершения', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'выгрузка списка покупок'
+        verbose_name_plural = 'выгрузки списков покупок'
+        indexes = [
+            models.Index(
+                fields=['status', 'id'], name='shopping_cart_job_status_idx')]
+
+    def __str__(self):
+        return f'Список покупок {self.user}: {self.status}'
+
+
+class SimilarRecipe(models.Model):
+    """Заранее посчитанные соседи рецепта по составу и тегам."""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='рецепт')
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='похожий рецепт')
+    score = models.FloatField('сходство')
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique_similar_recipe')]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score_idx')]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}'
@@ -0,0 +1,67 @@
+"""
+Популярность рецептов.
+
+score = (BASE_WEIGHT + FAVORITE_WEIGHT * избранное + CART_WEIGHT * покупки)
+        / (возраст в часах + 2) ** GRAVITY
+
+Полный пересчет (команда update_popularity) учитывает старение,
+а добавление и удаление из избранного или корзины сразу сдвигает
+оценку на вклад одного события.
+"""
+from django.apps import apps as global_apps
+from django.db.models import Count, F
+from django.utils import timezone
+
+from recipes.versions import POPULARITY, bump_version
+
+BASE_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+CART_WEIGHT = 1.0
+GRAVITY = 1.5
+BATCH_SIZE = 1000
+
+
+def get_decay(pub_date, now=None):
+    age = ((now or timezone.now()) - pub_date).total_seconds() / 3600
+    return 1 / (max(age, 0) + 2) ** GRAVITY
+
+
+def nudge_popularity(recipe_id, weight):
+    """Сдвигает оценку рецепта на вклад одного события."""
+    recipe_model = global_apps.get_model('recipes', 'Recipe')
+    pub_date = recipe_model.objects.filter(id=recipe_id).values_list(
+        'pub_date', flat=True).first()
+    if pub_date is not None:
+        recipe_model.objects.filter(id=recipe_id).update(
+            popularity=F('popularity') + weight * get_decay(pub_date))
+
+
+def _count(model, recipe_ids):
+    return dict(model.objects.filter(recipe_id__in=recipe_ids).values(
+        'recipe_id').annotate(count=Count('id')).values_list(
+        'recipe_id', 'count'))
+
+
+def recompute_popularity(batch_size=BATCH_SIZE):
+    """Пересчитывает оценки всех рецептов пачками."""
+    recipe_model = global_apps.get_model('recipes', 'Recipe')
+    favorites_model = global_apps.get_model('recipes', 'FavoriteRecipe')
+    cart_model = global_apps.get_model('recipes', 'ShoppingCart')
+    now = timezone.now()
+    last_id = 0
+    while True:
+        recipes = list(recipe_model.objects.filter(id__gt=last_id).order_by(
+            'id').only('id', 'pub_date', 'popularity')[:batch_size])
+        if not recipes:
+            break
+        recipe_ids = [recipe.id for recipe in recipes]
+        favorites = _count(favorites_model, recipe_ids)
+        carts = _count(cart_model, recipe_ids)
+        for recipe in recipes:
+            recipe.popularity = (
+                BASE_WEIGHT + FAVORITE_WEIGHT * favorites.get(recipe.id, 0)
+                + CART_WEIGHT * carts.get(recipe.id, 0)
+            ) * get_decay(recipe.pub_date, now)
+        recipe_model.objects.bulk_update(recipes, ('popularity',))
+        last_id = recipe_ids[-1]
+    bump_version(POPULARITY)
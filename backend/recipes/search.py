@@ -0,0 +1,99 @@
+"""Полнотекстовый поиск по рецептам."""
+from collections import defaultdict
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, StrIndex
+
+SEARCH_CONFIG = 'russian'
+BATCH_SIZE = 500
+
+
+def is_postgresql(model):
+    return connections[model.objects.db].vendor == 'postgresql'
+
+
+def get_search_document(name, ingredients, text):
+    """Текст для переносимого поиска: сначала название, затем состав."""
+    return '\n'.join((name, ingredients, text)).lower()
+
+
+def get_search_vector(name, ingredients, text):
+    return (
+        SearchVector(Value(name), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(ingredients), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Value(text), weight='C', config=SEARCH_CONFIG))
+
+
+def _update_search_batch(recipe_model, recipe_ids):
+    postgresql = is_postgresql(recipe_model)
+    ingredients = defaultdict(list)
+    for recipe_id, name in recipe_model.ingredients.through.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+            'recipe_id', 'ingredient__name').order_by('ingredient__name'):
+        ingredients[recipe_id].append(name)
+    for recipe_id, name, text in recipe_model.objects.filter(
+            id__in=recipe_ids).values_list('id', 'name', 'text'):
+        composition = ' '.join(ingredients[recipe_id])
+        fields = {
+            'search_document': get_search_document(name, composition, text)}
+        if postgresql:
+            fields['search_vector'] = get_search_vector(
+                name, composition, text)
+        recipe_model.objects.filter(id=recipe_id).update(**fields)
+
+
+def update_search_index(recipe_model, recipe_ids, batch_size=BATCH_SIZE):
+    """
+    Пересчитывает поисковые данные рецептов пачками.
+
+    Модель передается явно, чтобы функцию можно было вызвать
+    из миграции с историческими моделями.
+    """
+    batch = []
+    for recipe_id in recipe_ids:
+        batch.append(recipe_id)
+        if len(batch) >= batch_size:
+            _update_search_batch(recipe_model, batch)
+            batch = []
+    if batch:
+        _update_search_batch(recipe_model, batch)
+
+
+def rebuild_search_index(recipe_model, batch_size=BATCH_SIZE):
+    """Пересчитывает поисковые данные всех рецептов."""
+    last_id = 0
+    while True:
+        batch = list(recipe_model.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return
+        _update_search_batch(recipe_model, batch)
+        last_id = batch[-1]
+
+
+def search_recipes(queryset, query):
+    """
+    Фильтрует рецепты по запросу и добавляет аннотацию rank.
+
+    В PostgreSQL используется хранимый tsvector с GIN-индексом
+    и русским стеммингом, в остальных СУБД - поиск подстрок
+    в search_document, где совпадение ближе к началу (в названии)
+    считается более релевантным.
+    """
+    if is_postgresql(queryset.model):
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query))
+    terms = query.lower().split()
+    if not terms:
+        return queryset.none()
+    rank = Value(0.0)
+    for term in terms:
+        queryset = queryset.filter(search_document__contains=term)
+        rank += Value(1.0) / Cast(
+            StrIndex('search_document', Value(term)), FloatField())
+    return queryset.annotate(rank=rank)
@@ -0,0 +1,120 @@
+"""Сборка и отрисовка списка покупок в PDF."""
+import io
+import os
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from recipes.models import RecipeIngredient, ShoppingCartJob
+
+FONT_NAME = 'DejaVuSerif'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'DejaVuSerif.ttf')
+
+
+def get_shopping_cart(user):
+    """Суммарное количество каждого ингредиента из корзины пользователя."""
+    return list(RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    ).annotate(amount=Sum('amount')).order_by())
+
+
+def render_shopping_cart(shopping_cart):
+    """Рисует список покупок и возвращает буфер с PDF."""
+    # reportlab (а с ним и Pillow) нужен только здесь, поэтому не
+    # загружается при старте воркеров и management-команд.
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer)
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH, 'UTF-8'))
+    x_position, y_position = 50, 800
+    page.setFont(FONT_NAME, 14)
+    if shopping_cart:
+        indent = 20
+        page.drawString(x_position, y_position, 'Cписок покупок:')
+        for index, recipe in enumerate(shopping_cart, start=1):
+            page.drawString(
+                x_position, y_position - indent,
+                f'{index}. {recipe["ingredient__name"]} - '
+                f'{recipe["amount"]} '
+                f'{recipe["ingredient__measurement_unit"]}.')
+            y_position -= 15
+            if y_position <= 50:
+                page.showPage()
+                page.setFont(FONT_NAME, 14)
+                y_position = 800
+    else:
+        page.setFont(FONT_NAME, 24)
+        page.drawString(x_position, y_position, 'Пустой список покупок!')
+    page.save()
+    buffer.seek(0)
+    return buffer
+
+
+def enqueue_job(user):
+    """Ставит выгрузку в очередь, переиспользуя еще не начатую."""
+    job = ShoppingCartJob.objects.filter(
+        user=user, status=ShoppingCartJob.PENDING).first()
+    if job is not None:
+        return job
+    return ShoppingCartJob.objects.create(user=user)
+
+
+def claim_job():
+    """Забирает из очереди самую старую выгрузку."""
+    with transaction.atomic():
+        job = ShoppingCartJob.objects.select_for_update(
+            skip_locked=True).filter(
+            status=ShoppingCartJob.PENDING).order_by('id').first()
+        if job is None:
+            return None
+        job.status = ShoppingCartJob.RUNNING
+        job.started = timezone.now()
+        job.save(update_fields=('status', 'started'))
+    return job
+
+
+def run_job(job):
+    try:
+        buffer = render_shopping_cart(get_shopping_cart(job.user))
+        job.file.save(
+            f'{uuid4().hex}.pdf', ContentFile(buffer.getvalue()), save=False)
+        job.status = ShoppingCartJob.DONE
+    except Exception as error:
+        job.status = ShoppingCartJob.FAILED
+        job.error = repr(error)
+    job.finished = timezone.now()
+    job.save(update_fields=('file', 'status', 'error', 'finished'))
+
+
+def fail_stale_jobs(timeout):
+    """
+    Помечает ошибкой выгрузки, которые выполняются дольше timeout:
+    воркер, взявший их, завершился, не дописав результат.
+    """
+    now = timezone.now()
+    return ShoppingCartJob.objects.filter(
+        Q(started__lt=now - timeout) | Q(started__isnull=True),
+        status=ShoppingCartJob.RUNNING,
+    ).update(status=ShoppingCartJob.FAILED, finished=now,
+             error='Выгрузка прервана: воркер не завершил ее вовремя.')
+
+
+def delete_expired_jobs(max_age):
+    """Удаляет завершенные выгрузки старше max_age вместе с файлами."""
+    expired = ShoppingCartJob.objects.filter(
+        status__in=(ShoppingCartJob.DONE, ShoppingCartJob.FAILED),
+        finished__lt=timezone.now() - max_age)
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+    return expired.delete()[0]
@@ -0,0 +1,194 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+
+from recipes.catalog import schedule_catalog_build
+from recipes.feed import fan_out
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            ShoppingCart, Subscription, Tag, User)
+from recipes.popularity import (BASE_WEIGHT, CART_WEIGHT, FAVORITE_WEIGHT,
+                                nudge_popularity)
+from recipes.search import update_search_index
+from recipes.versions import (AUTHORS, FAVORITES, INGREDIENTS, POPULARITY,
+                              RECIPES, SHOPPING_CART, SUBSCRIPTIONS, TAGS,
+                              bump_version)
+
+# Отправляется после того, как ингредиенты рецепта записаны в базу.
+recipe_ingredients_changed = Signal()
+
+# Поля пользователя, которые выводятся в блоке автора рецепта.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def touch_recipes(recipes):
+    """Обновляет дату изменения рецептов без вызова save()."""
+    recipes.update(updated_at=timezone.now())
+
+
+def is_cascade(sender, kwargs):
+    """
+    Строка удаляется вместе с рецептом или пользователем, а не сама:
+    пересчитывать по ней популярность и версии не нужно.
+    """
+    origin = kwargs.get('origin')
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+def bump_on_commit(*namespaces, user_id=None):
+    """Увеличивает версии пространств после коммита транзакции."""
+    for namespace in namespaces:
+        transaction.on_commit(partial(bump_version, namespace, user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(sender, instance, **kwargs):
+    update_search_index(Recipe, [instance.id])
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def set_new_recipe_popularity(sender, instance, created, **kwargs):
+    if created:
+        nudge_popularity(instance.id, BASE_WEIGHT)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_composition_indexes(sender, instance, **kwargs):
+    update_search_index(Recipe, [instance.id])
+    ingredient_index.update_recipe(instance.id)
+    touch_recipes(Recipe.objects.filter(id=instance.id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        touch_recipes(Recipe.objects.filter(tags=instance))
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    elif not reverse:
+        touch_recipes(Recipe.objects.filter(id=instance.id))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(id__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_ingredient_index(sender, instance, **kwargs):
+    ingredient_index.remove_recipe(instance.id)
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, instance, **kwargs):
+    # Строки RecipeIngredient удалены каскадом без сигналов.
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search_index(sender, instance, created, **kwargs):
+    if not created:
+        update_search_index(
+            Recipe, list(instance.ingredient.values_list(
+                'recipe_id', flat=True)))
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_ingredient_catalog(sender, **kwargs):
+    schedule_catalog_build()
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def update_recipe_popularity(sender, instance, **kwargs):
+    if kwargs.get('created') is False or is_cascade(sender, kwargs):
+        return
+    weight = FAVORITE_WEIGHT if sender is FavoriteRecipe else CART_WEIGHT
+    if kwargs['signal'] is post_delete:
+        weight = -weight
+    nudge_popularity(instance.recipe_id, weight)
+    bump_on_commit(POPULARITY)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def bump_recipes_version(sender, **kwargs):
+    bump_on_commit(RECIPES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_on_commit(RECIPES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_on_commit(TAGS, RECIPES)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_on_commit(INGREDIENTS, RECIPES)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_authors_version(sender, **kwargs):
+    # Новый пользователь еще не автор, а вход обновляет только
+    # last_login.
+    update_fields = kwargs.get('update_fields')
+    if kwargs.get('created') or (
+            update_fields is not None
+            and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    bump_on_commit(AUTHORS)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_user_version(sender, instance, **kwargs):
+    # Избранное и корзина чужих пользователей при удалении рецепта
+    # покрываются версией RECIPES; подписки при удалении автора - нет.
+    if sender is not Subscription and is_cascade(sender, kwargs):
+        return
+    namespace = {
+        FavoriteRecipe: FAVORITES,
+        ShoppingCart: SHOPPING_CART,
+        Subscription: SUBSCRIPTIONS,
+    }[sender]
+    bump_on_commit(namespace, user_id=instance.user_id)
@@ -0,0 +1,164 @@
+"""
+Похожие рецепты.
+
+Рецепт представляется разреженным вектором из ингредиентов и тегов
+с весами idf, сходство двух рецептов считается косинусом между их
+векторами. Для каждого рецепта в SimilarRecipe хранятся count
+ближайших соседей, поэтому выдача похожих рецептов сводится к
+запросу по индексу.
+
+При частичном пересчете обновляются измененные рецепты и те, в чьих
+списках соседей они есть или могут появиться.
+"""
+from array import array
+
+import numpy
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from scipy import sparse
+
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+COUNT = getattr(settings, 'SIMILAR_RECIPES_COUNT', 10)
+TAG_WEIGHT = 0.5
+BATCH_SIZE = 500
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_matrix(recipe_ids):
+    """Нормированные векторы рецептов в порядке recipe_ids."""
+    positions = {recipe_id: index for index, recipe_id in enumerate(
+        recipe_ids)}
+    rows, columns, weights = array('q'), array('q'), array('d')
+    features = {}
+    pairs = (
+        (1.0, RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id').order_by().distinct()),
+        (TAG_WEIGHT, Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id').order_by()),
+    )
+    for kind, (weight, queryset) in enumerate(pairs):
+        for recipe_id, feature_id in queryset.iterator():
+            if recipe_id not in positions:
+                continue
+            rows.append(positions[recipe_id])
+            columns.append(features.setdefault(
+                (kind, feature_id), len(features)))
+            weights.append(weight)
+    rows = numpy.frombuffer(rows, dtype=numpy.int64)
+    columns = numpy.frombuffer(columns, dtype=numpy.int64)
+    frequency = numpy.bincount(columns, minlength=len(features))
+    idf = numpy.log((1 + len(recipe_ids)) / (1 + frequency)) + 1
+    matrix = sparse.csr_matrix(
+        (numpy.frombuffer(weights) * idf[columns], (rows, columns)),
+        shape=(len(recipe_ids), len(features)))
+    norms = numpy.sqrt(numpy.asarray(
+        matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def score_rows(matrix, positions):
+    """Сходство рецептов positions со всеми остальными."""
+    scores = (matrix[positions] @ matrix.T).tocsr()
+    for row, position in enumerate(positions):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        columns = scores.indices[start:end]
+        values = scores.data[start:end]
+        other = (columns != position) & (values > 0)
+        yield position, columns[other], values[other]
+
+
+def top_neighbors(columns, values, count):
+    if len(values) > count:
+        top = numpy.argpartition(-values, count)[:count]
+        columns, values = columns[top], values[top]
+    order = numpy.argsort(-values, kind='stable')
+    return columns[order], values[order]
+
+
+def _save_neighbors(recipe_ids, neighbors, updated):
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            recipe_id__in=list(neighbors)).delete()
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe_id,
+                          similar_id=recipe_ids[column], score=float(score))
+            for recipe_id, (columns, values) in neighbors.items()
+            for column, score in zip(columns, values))
+        Recipe.objects.filter(id__in=list(neighbors)).update(
+            similar_updated_at=updated)
+
+
+def _get_affected(changed, candidates, count, batch_size):
+    """
+    Рецепты, чьи списки соседей могут измениться: в них есть
+    измененный рецепт или его новое сходство выше худшего соседа.
+    """
+    affected = set(SimilarRecipe.objects.filter(
+        similar_id__in=changed).values_list('recipe_id', flat=True))
+    for chunk in _chunks(list(candidates), batch_size):
+        thresholds = dict.fromkeys(chunk, 0)
+        thresholds.update(
+            (recipe_id, worst) for recipe_id, size, worst in
+            SimilarRecipe.objects.filter(recipe_id__in=chunk).values(
+                'recipe_id').annotate(
+                size=Count('id'), worst=Min('score')).values_list(
+                'recipe_id', 'size', 'worst')
+            if size >= count)
+        affected.update(recipe_id for recipe_id in chunk
+                        if candidates[recipe_id] > thresholds[recipe_id])
+    return affected - set(changed)
+
+
+def refresh_similar_recipes(full=False, count=COUNT, batch_size=BATCH_SIZE):
+    """
+    Пересчитывает соседей измененных рецептов, а при full — всех.
+    Возвращает количество пересчитанных рецептов.
+    """
+    started = timezone.now()
+    recipe_ids = list(Recipe.objects.order_by('id').values_list(
+        'id', flat=True))
+    positions = {recipe_id: index for index, recipe_id in enumerate(
+        recipe_ids)}
+    recipes = Recipe.objects.order_by('id')
+    if not full:
+        recipes = recipes.filter(
+            Q(similar_updated_at=None)
+            | Q(updated_at__gt=F('similar_updated_at')))
+    changed = [recipe_id for recipe_id in recipes.values_list(
+        'id', flat=True) if recipe_id in positions]
+    if not changed:
+        return 0
+    matrix = build_matrix(recipe_ids)
+    candidates = {}
+    for chunk in _chunks(changed, batch_size):
+        neighbors = {}
+        for position, columns, values in score_rows(
+                matrix, [positions[recipe_id] for recipe_id in chunk]):
+            neighbors[recipe_ids[position]] = top_neighbors(
+                columns, values, count)
+            if not full:
+                for column, score in zip(columns, values):
+                    similar_id = recipe_ids[column]
+                    candidates[similar_id] = max(
+                        score, candidates.get(similar_id, 0))
+        _save_neighbors(recipe_ids, neighbors, started)
+    if full:
+        return len(changed)
+    affected = sorted(
+        _get_affected(changed, candidates, count, batch_size)
+        & positions.keys())
+    for chunk in _chunks(affected, batch_size):
+        neighbors = {
+            recipe_ids[position]: top_neighbors(columns, values, count)
+            for position, columns, values in score_rows(
+                matrix, [positions[recipe_id] for recipe_id in chunk])}
+        _save_neighbors(recipe_ids, neighbors, started)
+    return len(changed) + len(affected)
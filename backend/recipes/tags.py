@@ -0,0 +1,10 @@
+"""Соответствие слагов тегов их id в памяти процесса."""
+from recipes.models import Tag
+from recipes.versions import TAGS, VersionedCache
+
+tag_map = VersionedCache(
+    TAGS, lambda: dict(Tag.objects.values_list('slug', 'id')))
+
+
+def get_tag_map():
+    return tag_map.get()
@@ -0,0 +1,120 @@
+import json
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+class ImportRecipesTest(TestCase):
+    """Команда import_recipes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Поваров', password='pass')
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def get_row(self, name='Омлет', author=None, tags=()):
+        return {
+            'author': author or {
+                'email': 'new@example.com', 'username': 'new',
+                'first_name': 'Новый', 'last_name': 'Автор'},
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': '',
+            'pub_date': '2023-01-01T10:00:00+00:00',
+            'tags': list(tags),
+            'ingredients': [
+                {'name': 'яйцо', 'measurement_unit': 'шт', 'amount': 2}],
+        }
+
+    def import_rows(self, *rows):
+        with NamedTemporaryFile('w', suffix='.jsonl') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            file.flush()
+            call_command('import_recipes', file.name, stdout=StringIO())
+
+    def test_duplicates_are_skipped(self):
+        row = self.get_row()
+        self.import_rows(row, row, self.get_row('Каша'))
+        self.import_rows(row)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            ['Каша', 'Омлет'])
+        self.assertEqual(User.objects.filter(username='new').count(), 1)
+
+    def test_username_conflict(self):
+        author = {'email': 'other@example.com', 'username': 'cook',
+                  'first_name': 'Другой', 'last_name': 'Повар'}
+        with self.assertRaisesMessage(CommandError, 'cook@example.com'):
+            self.import_rows(self.get_row(author=author))
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_tag_conflict(self):
+        tag = {'name': 'Завтрак', 'color': '#000000', 'slug': 'morning'}
+        with self.assertRaisesMessage(CommandError, 'breakfast'):
+            self.import_rows(self.get_row(tags=[tag]))
+        self.assertFalse(Tag.objects.filter(slug='morning').exists())
+
+    def test_existing_tag_is_reused(self):
+        tag = {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'}
+        self.import_rows(self.get_row(tags=[tag]))
+        self.assertEqual(
+            list(Recipe.objects.get().tags.values_list('slug', flat=True)),
+            ['breakfast'])
+
+
+class IngredientIndexTest(TestCase):
+    """Индекс ингредиентов догоняет изменения других процессов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Поваров', password='pass')
+        cls.egg = Ingredient.objects.create(
+            name='яйцо', measurement_unit='шт')
+        cls.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл')
+
+    def create_recipe(self, index, *ingredients):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Омлет', text='Описание',
+            cooking_time=10)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients)
+        index.update_recipe(recipe.id)
+        return recipe
+
+    def get_recipe_ids(self, index, *ingredients):
+        return [recipe_id for recipe_id, _, _ in index.cover(
+            [ingredient.id for ingredient in ingredients])]
+
+    def test_catch_up_without_rebuild(self):
+        writer, reader = IngredientIndex(), IngredientIndex()
+        omelette = self.create_recipe(writer, self.egg, self.milk)
+        self.assertEqual(
+            self.get_recipe_ids(reader, self.egg, self.milk), [omelette.id])
+        reader._build = None
+        boiled = self.create_recipe(writer, self.egg)
+        omelette.delete()
+        self.assertEqual(
+            self.get_recipe_ids(reader, self.egg, self.milk), [boiled.id])
+
+    def test_ingredient_delete_rebuilds(self):
+        index = IngredientIndex()
+        recipe = self.create_recipe(index, self.egg, self.milk)
+        self.assertEqual(self.get_recipe_ids(index, self.egg), [])
+        self.milk.delete()
+        self.assertEqual(self.get_recipe_ids(index, self.egg), [recipe.id])
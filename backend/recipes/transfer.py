@@ -0,0 +1,253 @@
+"""
+Перенос рецептов между окружениями в формате JSON Lines.
+
+Каждая строка — рецепт с автором, тегами, ингредиентами и путем
+к изображению. Сами файлы изображений не переносятся.
+
+Рецепты создаются через bulk_create без сигналов, поэтому поисковые
+данные, популярность и ленты подписчиков заполняются здесь же.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from recipes.catalog import schedule_catalog_build
+from recipes.feed import fan_out_recipes
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.popularity import BASE_WEIGHT, get_decay
+from recipes.search import update_search_index
+from recipes.versions import INGREDIENTS, RECIPES, TAGS, bump_version
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def _export_batch(recipes):
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    tags = {}
+    for recipe_id, name, color, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+            'recipe_id', 'tag__name', 'tag__color', 'tag__slug'):
+        tags.setdefault(recipe_id, []).append(
+            {'name': name, 'color': color, 'slug': slug})
+    ingredients = {}
+    for recipe_id, name, unit, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids).order_by('id').values_list(
+            'recipe_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'):
+        ingredients.setdefault(recipe_id, []).append(
+            {'name': name, 'measurement_unit': unit, 'amount': amount})
+    for recipe in recipes:
+        yield {
+            'id': recipe['id'],
+            'author': {field: recipe[f'author__{field}']
+                       for field in AUTHOR_FIELDS},
+            'name': recipe['name'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+            'image': recipe['image'],
+            'pub_date': recipe['pub_date'].isoformat(),
+            'tags': tags.get(recipe['id'], []),
+            'ingredients': ingredients.get(recipe['id'], []),
+        }
+
+
+def export_recipes(file, after_id=0, batch_size=BATCH_SIZE):
+    """
+    Пишет рецепты с id больше after_id в file по одному на строку.
+    Возвращает количество рецептов и id последнего из них.
+    """
+    exported = 0
+    while True:
+        recipes = list(Recipe.objects.filter(id__gt=after_id).order_by(
+            'id').values(
+            'id', 'name', 'text', 'cooking_time', 'image', 'pub_date',
+            *(f'author__{field}' for field in AUTHOR_FIELDS))[:batch_size])
+        if not recipes:
+            return exported, after_id
+        for recipe in _export_batch(recipes):
+            file.write(json.dumps(recipe, ensure_ascii=False) + '\n')
+        exported += len(recipes)
+        after_id = recipes[-1]['id']
+
+
+def _get_authors(rows):
+    """
+    Сопоставляет авторов по email и создает недостающих. Новый автор,
+    имя пользователя которого уже занято другим пользователем, — ошибка.
+    """
+    authors = {row['author']['email']: row['author'] for row in rows}
+    existing = dict(User.objects.filter(email__in=authors).values_list(
+        'email', 'id'))
+    missing = {email: author for email, author in authors.items()
+               if email not in existing}
+    if not missing:
+        return existing
+    usernames = {author['username'] for author in missing.values()}
+    conflicts = [
+        f'{author["email"]}: имя пользователя «{username}» уже у {email}'
+        for username, email in User.objects.filter(
+            username__in=usernames).values_list('username', 'email')
+        for author in missing.values() if author['username'] == username]
+    if len(usernames) < len(missing):
+        conflicts.append(
+            'в файле разные авторы с одинаковым именем пользователя: '
+            + ', '.join(sorted(missing)))
+    if conflicts:
+        raise ValueError('Конфликт авторов: ' + '; '.join(conflicts))
+    User.objects.bulk_create(
+        User(password=make_password(None), **author)
+        for author in missing.values())
+    existing.update(User.objects.filter(email__in=missing).values_list(
+        'email', 'id'))
+    return existing
+
+
+def _get_tags(rows, tags):
+    """
+    Сопоставляет теги по слагу и создает недостающие. Новый тег,
+    название или цвет которого уже заняты другим тегом, — ошибка.
+    """
+    missing = {tag['slug']: tag for row in rows for tag in row['tags']
+               if tag['slug'] not in tags}
+    if not missing:
+        return
+    names = {tag['name'] for tag in missing.values()}
+    colors = {tag['color'] for tag in missing.values()}
+    conflicts = []
+    for existing, name, color in Tag.objects.filter(
+            Q(name__in=names) | Q(color__in=colors)).values_list(
+            'slug', 'name', 'color'):
+        for slug, tag in missing.items():
+            if tag['name'] == name:
+                conflicts.append(
+                    f'{slug}: название «{name}» уже у тега {existing}')
+            if tag['color'] == color:
+                conflicts.append(f'{slug}: цвет {color} уже у тега {existing}')
+    if len(names) < len(missing) or len(colors) < len(missing):
+        conflicts.append(
+            'в файле разные теги с одинаковым названием или цветом: '
+            + ', '.join(sorted(missing)))
+    if conflicts:
+        raise ValueError('Конфликт тегов: ' + '; '.join(conflicts))
+    Tag.objects.bulk_create(Tag(**tag) for tag in missing.values())
+    tags.update(Tag.objects.filter(slug__in=missing).values_list(
+        'slug', 'id'))
+
+
+def _get_ingredients(rows, ingredients):
+    missing = {
+        (ingredient['name'], ingredient['measurement_unit'])
+        for row in rows for ingredient in row['ingredients']
+        if (ingredient['name'], ingredient['measurement_unit'])
+        not in ingredients}
+    if missing:
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in missing)
+        ingredients.update(
+            ((name, unit), ingredient_id)
+            for name, unit, ingredient_id in Ingredient.objects.filter(
+                name__in={name for name, _ in missing}).values_list(
+                'name', 'measurement_unit', 'id')
+            if (name, unit) in missing)
+
+
+def _import_batch(rows, tags, ingredients):
+    """Сохраняет пачку рецептов, пропуская уже загруженные."""
+    with transaction.atomic():
+        authors = _get_authors(rows)
+        for row in rows:
+            row['pub_date'] = parse_datetime(row['pub_date'])
+        existing = set(Recipe.objects.filter(
+            author_id__in=authors.values(),
+            name__in={row['name'] for row in rows}).values_list(
+            'author_id', 'name', 'pub_date'))
+        unique_rows = []
+        for row in rows:
+            key = (
+                authors[row['author']['email']], row['name'], row['pub_date'])
+            if key not in existing:
+                # Повтор внутри пачки тоже пропускается.
+                existing.add(key)
+                unique_rows.append(row)
+        rows = unique_rows
+        if not rows:
+            return 0
+        _get_tags(rows, tags)
+        _get_ingredients(rows, ingredients)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author_id=authors[row['author']['email']],
+                name=row['name'],
+                text=row['text'],
+                cooking_time=row['cooking_time'],
+                image=row['image'],
+                popularity=BASE_WEIGHT * get_decay(row['pub_date']))
+            for row in rows)
+        for recipe, row in zip(recipes, rows):
+            recipe.pub_date = row['pub_date']
+        Recipe.objects.bulk_update(recipes, ('pub_date',))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.id,
+                ingredient_id=ingredients[(
+                    ingredient['name'], ingredient['measurement_unit'])],
+                amount=ingredient['amount'])
+            for recipe, row in zip(recipes, rows)
+            for ingredient in row['ingredients'])
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[tag['slug']])
+            for recipe, row in zip(recipes, rows) for tag in row['tags'])
+        update_search_index(Recipe, [recipe.id for recipe in recipes])
+        fan_out_recipes(recipes)
+    return len(rows)
+
+
+def import_recipes(lines, batch_size=BATCH_SIZE, progress=None):
+    """
+    Загружает рецепты из строк JSON Lines пачками по batch_size,
+    каждая пачка — отдельная транзакция.
+
+    Уже загруженные рецепты (тот же автор, название и дата публикации)
+    пропускаются, поэтому прерванную загрузку можно просто повторить.
+    Возвращает количество прочитанных и созданных рецептов.
+    """
+    tags = dict(Tag.objects.values_list('slug', 'id'))
+    ingredients = {
+        (name, unit): ingredient_id
+        for name, unit, ingredient_id in Ingredient.objects.values_list(
+            'name', 'measurement_unit', 'id').iterator()}
+    known_tags, known_ingredients = len(tags), len(ingredients)
+    read = created = 0
+    batch = []
+    try:
+        for line in lines:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                created += _import_batch(batch, tags, ingredients)
+                read += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(read, created)
+        if batch:
+            created += _import_batch(batch, tags, ingredients)
+            read += len(batch)
+    finally:
+        if created:
+            ingredient_index.invalidate()
+            bump_version(RECIPES)
+        if len(tags) > known_tags:
+            bump_version(TAGS)
+        if len(ingredients) > known_ingredients:
+            bump_version(INGREDIENTS)
+            schedule_catalog_build()
+    return read, created
@@ -0,0 +1,108 @@
+"""
+Версии данных для сброса кешей во всех процессах.
+
+Сигналы моделей после коммита увеличивают счетчики в таблице
+DataVersion: по пространству (recipes, tags, ingredients,
+ingredient_index, popularity, authors) и по пользователю (favorites,
+shopping_cart, subscriptions). Локальный кеш хранит версию, с которой
+он собран, и перед использованием сверяет ее одним запросом к основной
+базе.
+
+Счетчики хранятся в базе, а не в кеше: кеш по умолчанию может быть
+локальным для процесса, и тогда увеличение версии не дошло бы
+до других воркеров. Новый счетчик начинается с текущего времени
+в миллисекундах, поэтому версии не повторяются и после очистки таблицы.
+"""
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+
+from recipes.models import DataVersion
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+INGREDIENT_INDEX = 'ingredient_index'
+POPULARITY = 'popularity'
+AUTHORS = 'authors'
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTIONS = 'subscriptions'
+
+
+def get_version_key(namespace, user_id=None):
+    if user_id is None:
+        return f'version:{namespace}'
+    return f'version:{namespace}:{user_id}'
+
+
+def _initial_version():
+    return time.time_ns() // 1_000_000
+
+
+def _versions():
+    # Мимо маршрутизатора реплик: отстающая реплика вернула бы
+    # старую версию, а вставка счетчика не должна считаться записью
+    # запроса.
+    return DataVersion.objects.using(DEFAULT_DB_ALIAS)
+
+
+def get_versions(*keys):
+    """
+    Текущие версии для пар (пространство, id пользователя или None)
+    одним запросом к базе.
+    """
+    db_keys = {get_version_key(*key): key for key in keys}
+    versions = dict(_versions().filter(key__in=db_keys).values_list(
+        'key', 'value'))
+    missing = [db_key for db_key in db_keys if db_key not in versions]
+    if missing:
+        _versions().bulk_create(
+            (DataVersion(key=db_key, value=_initial_version())
+             for db_key in missing), ignore_conflicts=True)
+        versions.update(_versions().filter(key__in=missing).values_list(
+            'key', 'value'))
+    return {key: versions[db_key] for db_key, key in db_keys.items()}
+
+
+def get_version(namespace, user_id=None):
+    return get_versions((namespace, user_id))[(namespace, user_id)]
+
+
+def bump_version(namespace, user_id=None):
+    """Увеличивает версию и возвращает новое значение."""
+    key = get_version_key(namespace, user_id)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        # Строка заблокирована обновлением до конца транзакции,
+        # поэтому прочитанное значение — ровно наше увеличение.
+        if not _versions().filter(key=key).update(value=F('value') + 1):
+            _versions().bulk_create(
+                [DataVersion(key=key, value=_initial_version())],
+                ignore_conflicts=True)
+            _versions().filter(key=key).update(value=F('value') + 1)
+        return _versions().get(key=key).value
+
+
+class VersionedCache:
+    """
+    Значение в памяти процесса, которое пересобирается загрузчиком,
+    когда меняется версия пространства namespace.
+    """
+
+    def __init__(self, namespace, loader):
+        self.namespace = namespace
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+
+    def get(self):
+        version = get_version(self.namespace)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._value = self.loader()
+                    self._version = version
+        return self._value
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+PREFIX_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # Индексы под запрос field__istartswith, который Postgres
+    # выполняет как UPPER(field::text) LIKE 'PREFIX%'.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in PREFIX_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX users_user_{field}_upper_like ON users_user '
+            f'((UPPER("{field}"::text)) text_pattern_ops)')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in PREFIX_FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS users_user_{field}_upper_like')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]